@@ -32,7 +32,7 @@ async def create_collection(
     """Create a new Qdrant collection using flow_id as collection name"""
     try:
         result = await flow_service.create_collection_for_flow(request, flow_id)
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         error_msg = str(e)
         if "authentication" in error_msg.lower() or "token" in error_msg.lower():
@@ -82,7 +82,7 @@ async def list_files_in_collection(
     """List all files in a specific collection using flow_id"""
     try:
         result = await flow_service.list_collection_files(request, flow_id)
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         error_msg = str(e)
         if "authentication" in error_msg.lower() or "token" in error_msg.lower():
@@ -156,7 +156,7 @@ async def upload_file_to_collection(
             chunk_overlap=chunk_overlap,
             include_images=include_images,
         )
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         error_msg = str(e)
         if "authentication" in error_msg.lower() or "token" in error_msg.lower():
@@ -213,7 +213,7 @@ async def delete_file_from_collection(
             flow_id=flow_id,
             file_path=file_path
         )
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         error_msg = str(e)
         if "authentication" in error_msg.lower() or "token" in error_msg.lower():
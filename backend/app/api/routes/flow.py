@@ -72,7 +72,7 @@ async def get_component_ids(request: Request, flow_id: str) -> Dict[str, Any]:
     """Get all component IDs from a specific flow"""
     try:
         component_info = await flow_service.get_flow_component_ids(request, flow_id)
-        return component_info.dict()
+        return component_info.model_dump()
     except ValueError as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -114,7 +114,7 @@ async def delete_flow(request: Request, flow_id: str) -> Dict[str, Any]:
             else:
                 raise HTTPException(status_code=500, detail=result.message)
 
-        return result.dict()
+        return result.model_dump()
     except HTTPException:
         raise
     except ValueError as e:
@@ -150,7 +150,7 @@ async def run_flow(
     """Execute a flow with given payload"""
     try:
         result = await flow_service.execute_flow(request, flow_id, payload)
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -65,7 +65,7 @@ async def get_session_info(
     """Get information about a chat session"""
     try:
         session_info = await message_service.get_session_information(request, session_id)
-        return session_info.dict()
+        return session_info.model_dump()
     except ValueError as e:
         error_msg = str(e)
         if "authentication" in error_msg.lower() or "token" in error_msg.lower():
@@ -103,7 +103,7 @@ async def end_session(request: Request, session_id: str) -> Dict[str, Any]:
     """End a specific chat session"""
     try:
         result = await message_service.end_chat_session(request, session_id)
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         error_msg = str(e)
         if "authentication" in error_msg.lower() or "token" in error_msg.lower():
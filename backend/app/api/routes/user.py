@@ -23,7 +23,7 @@ async def create_user(user: UserCreate) -> Dict[str, Any]:
     """Create a new user in Langflow"""
     try:
         result = await user_service.create_user(user)
-        return result.dict()
+        return result.model_dump()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -33,7 +33,7 @@ async def login(user: UserCreate, request: Request, response: Response) -> Dict[
     """Login user and set authentication cookies"""
     try:
         result = await user_service.login_user(user, request, response)
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         return {"success": False, "message": str(e)}
     except Exception as e:
@@ -45,7 +45,7 @@ async def refresh_token(request: Request, response: Response) -> Dict[str, Any]:
     """Refresh access token using httpOnly refresh token"""
     try:
         result = await user_service.refresh_user_token(request, response)
-        return result.dict()
+        return result.model_dump()
     except ValueError as e:
         # Expected errors like expired tokens
         return {"success": False, "message": str(e), "should_login": True}
@@ -58,7 +58,7 @@ async def logout(request: Request, response: Response) -> Dict[str, Any]:
     """Logout user and clear all cookies"""
     try:
         result = await user_service.logout_user(request, response)
-        return result.dict()
+        return result.model_dump()
     except Exception as e:
         return {"success": True, "message": "Logout completed with errors"}
 
@@ -100,7 +100,7 @@ async def delete_user(request: Request, user_id: str) -> Dict[str, Any]:
                 detail=result.message
             )
 
-        return result.dict()
+        return result.model_dump()
     except HTTPException:
         raise
     except Exception as e:
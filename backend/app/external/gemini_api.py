@@ -11,9 +11,25 @@ VISION_MODEL = os.getenv('DEFAULT_GOOGLE_VISION')
 genai.configure(api_key=API_KEY)
 model = genai.GenerativeModel(VISION_MODEL)
 
+# (prefix, marker required within the first 16 bytes, mime type)
+_IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', None, "image/jpeg"),
+    (b'\x89PNG\r\n\x1a\n', None, "image/png"),
+    (b'RIFF', b'WEBP', "image/webp"),
+)
+
+
+def _detect_mime_type(image_bytes: bytes) -> str:
+    """Detect the image mime type from its magic bytes, defaulting to JPEG"""
+    for prefix, marker, mime_type in _IMAGE_SIGNATURES:
+        if image_bytes.startswith(prefix) and (marker is None or marker in image_bytes[:16]):
+            return mime_type
+    return "image/jpeg"
+
 
 def get_gemini_description(image_bytes: bytes):
-    cached_description = gemini_image_cache.get_description(image_bytes)
+    image_hash = compute_image_hash(image_bytes)
+    cached_description = gemini_image_cache.get_description_by_hash(image_hash)
     if cached_description:
         return cached_description
 
@@ -21,14 +37,14 @@ def get_gemini_description(image_bytes: bytes):
 
     response = model.generate_content([
         {
-            "mime_type": "image/jpeg",
+            "mime_type": _detect_mime_type(image_bytes),
             "data": image_bytes
         },
         prompt
     ])
 
     description = response.text
-    gemini_image_cache.store_description(image_bytes, description)
+    gemini_image_cache.store_description_by_hash(image_hash, description)
 
     return description
 
@@ -1,10 +1,10 @@
-import requests
 import json
 import os
 from typing import Dict, Any, List, Optional
 from ..models.user import UserCreate
 from ..models.message import LangflowMessageResponse, GeneratedFileData
 from ..utils.message_parsing import extract_bot_response_with_files
+from ..utils.http_session import get_async_client
 
 
 class LangflowRepository:
@@ -24,7 +24,7 @@ class LangflowRepository:
         """Check if Langflow service is reachable"""
         try:
             url = f"{self.base_url}{self.health_endpoint}"
-            response = requests.get(url, timeout=5)
+            response = await get_async_client().get(url, timeout=5)
             return response.status_code == 200
         except Exception:
             return False
@@ -41,8 +41,8 @@ class LangflowRepository:
             'Accept': 'application/json'
         }
 
-        response = requests.post(url, headers=headers, data=payload)
-        if not response.ok:
+        response = await get_async_client().post(url, headers=headers, data=payload, timeout=None)
+        if response.is_error:
             raise Exception(f"Authentication failed: {response.text}")
 
         return response.json()
@@ -54,19 +54,22 @@ class LangflowRepository:
             'Authorization': f'Bearer {access_token}'
         }
 
-        response = requests.get(url, headers=headers, timeout=10)
-        if not response.ok:
+        response = await get_async_client().get(url, headers=headers, timeout=10)
+        if response.is_error:
             raise Exception(f"User validation failed: {response.status_code} - {response.text}")
 
         return response.json()
 
     async def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         url = f"{self.base_url}{self.auth_refresh_endpoint}"
-        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
-        cookies = {'refresh_token_lf': refresh_token}
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Cookie': f'refresh_token_lf={refresh_token}'
+        }
 
-        response = requests.post(url, headers=headers, cookies=cookies)
-        if not response.ok:
+        response = await get_async_client().post(url, headers=headers, timeout=None)
+        if response.is_error:
             raise Exception(f"Token refresh failed: {response.text}")
 
         return response.json()
@@ -78,8 +81,8 @@ class LangflowRepository:
                 'Accept': 'application/json',
                 'Authorization': f'Bearer {access_token}'
             }
-            response = requests.post(url, headers=headers, timeout=5)
-            return response.ok
+            response = await get_async_client().post(url, headers=headers, timeout=5)
+            return not response.is_error
         except Exception:
             return False
 
@@ -95,8 +98,8 @@ class LangflowRepository:
             "password": user_data.password
         })
 
-        response = requests.post(url, headers=headers, data=payload)
-        if not response.ok:
+        response = await get_async_client().post(url, headers=headers, content=payload, timeout=None)
+        if response.is_error:
             raise Exception(f"User creation failed: {response.text}")
 
         return response.json()
@@ -113,7 +116,7 @@ class LangflowRepository:
             "is_superuser": False
         })
 
-        response = requests.patch(url, headers=headers, data=payload)
+        response = await get_async_client().patch(url, headers=headers, content=payload, timeout=None)
         return response.status_code in (200, 204)
 
     async def delete_user(self, user_id: str, admin_token: str) -> bool:
@@ -124,7 +127,7 @@ class LangflowRepository:
             'Authorization': f'Bearer {admin_token}'
         }
 
-        response = requests.delete(url, headers=headers)
+        response = await get_async_client().delete(url, headers=headers, timeout=None)
         return response.status_code in (200, 204)
 
     async def get_flows(self, token: str, remove_example_flows: bool = True,
@@ -141,8 +144,8 @@ class LangflowRepository:
             'Authorization': f'Bearer {token}'
         }
 
-        response = requests.get(url, headers=headers, params=params)
-        if not response.ok:
+        response = await get_async_client().get(url, headers=headers, params=params, timeout=None)
+        if response.is_error:
             raise Exception(f"Failed to get flows: {response.text}")
 
         return response.json()
@@ -160,8 +163,8 @@ class LangflowRepository:
             'header_flows': 'false'
         }
 
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-        if not response.ok:
+        response = await get_async_client().get(url, headers=headers, params=params, timeout=30)
+        if response.is_error:
             raise Exception(f"Failed to get all flows: HTTP {response.status_code} - {response.text}")
 
         flows = response.json()
@@ -175,8 +178,8 @@ class LangflowRepository:
             'Authorization': f'Bearer {token}'
         }
 
-        response = requests.get(url, headers=headers)
-        if not response.ok:
+        response = await get_async_client().get(url, headers=headers, timeout=None)
+        if response.is_error:
             raise Exception(f"Failed to get flow: {response.text}")
 
         return response.json()
@@ -196,8 +199,8 @@ class LangflowRepository:
             'Authorization': f'Bearer {token}'
         }
 
-        response = requests.post(url, headers=headers, files=files, data=data)
-        if not response.ok:
+        response = await get_async_client().post(url, headers=headers, files=files, data=data, timeout=None)
+        if response.is_error:
             raise Exception(f"Flow upload failed: {response.text}")
 
         return response.json()
@@ -209,8 +212,8 @@ class LangflowRepository:
             'Authorization': f'Bearer {token}'
         }
 
-        response = requests.delete(url, headers=headers)
-        if not response.ok:
+        response = await get_async_client().delete(url, headers=headers, timeout=None)
+        if response.is_error:
             raise Exception(f"Flow deletion failed: {response.text}")
 
         try:
@@ -226,8 +229,8 @@ class LangflowRepository:
             'x-api-key': api_key
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=3600)
-        if not response.ok:
+        response = await get_async_client().post(url, headers=headers, json=payload, timeout=3600)
+        if response.is_error:
             raise Exception(f"Flow execution failed: {response.text}")
 
         response_data = response.json()
@@ -260,8 +263,8 @@ class LangflowRepository:
             "description": description
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        if not response.ok:
+        response = await get_async_client().post(url, headers=headers, json=payload, timeout=10)
+        if response.is_error:
             raise Exception(f"API key creation failed: {response.text}")
 
         return response.json()
@@ -275,7 +278,7 @@ class LangflowRepository:
                 'Authorization': f'Bearer {token}'
             }
 
-            response = requests.delete(url, headers=headers, timeout=10)
-            return response.ok
+            response = await get_async_client().delete(url, headers=headers, timeout=10)
+            return not response.is_error
         except Exception:
             return False
@@ -1,10 +1,28 @@
 import os
+import time
 from functools import lru_cache
 
 import requests
 import base64
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from ..models.embedding import EmbeddingResponse, ModelInfo
+from ..utils.http_session import create_session, get_async_client
+
+_session = create_session()
+
+# Output dimensions of common Ollama embedding models, so no probe request is needed
+KNOWN_EMBEDDING_DIMENSIONS = {
+    "nomic-embed-text": 768,
+    "mxbai-embed-large": 1024,
+    "all-minilm": 384,
+}
+
+# Probed vector sizes per (Ollama URL, model), shared by all repository instances
+_vector_size_cache: Dict[Tuple[str, str], int] = {}
+
+# Installed models change rarely, so the tag list is reused for a few seconds per Ollama URL
+MODELS_CACHE_TTL = 15
+_models_cache: Dict[str, Tuple[float, List[ModelInfo]]] = {}
 
 
 class OllamaRepository:
@@ -16,12 +34,10 @@ class OllamaRepository:
         self.default_embedding_model = os.getenv("DEFAULT_EMBEDDING_MODEL", "nomic-embed-text")
         self.default_vision_model = os.getenv("DEFAULT_VISION_MODEL", "llava:7b")
 
-        self._vector_size_cache = {}
-
     async def check_connection(self) -> bool:
         """Check if Ollama service is reachable"""
         try:
-            response = requests.get(f"{self.base_url}{self.tags_endpoint}", timeout=5)
+            response = await get_async_client().get(f"{self.base_url}{self.tags_endpoint}", timeout=5)
             return response.status_code == 200
         except Exception:
             return False
@@ -29,14 +45,18 @@ class OllamaRepository:
     # Model Management
     async def get_available_models(self) -> List[ModelInfo]:
         """Get all available models from Ollama"""
+        cached = _models_cache.get(self.base_url)
+        if cached is not None and cached[0] > time.monotonic():
+            return list(cached[1])
+
         try:
-            response = requests.get(f"{self.base_url}{self.tags_endpoint}", timeout=10)
+            response = await get_async_client().get(f"{self.base_url}{self.tags_endpoint}", timeout=10)
             response.raise_for_status()
 
             data = response.json()
             models = data.get("models", [])
 
-            return [
+            model_infos = [
                 ModelInfo(
                     name=model.get("name", ""),
                     size=model.get("size", 0),
@@ -48,6 +68,9 @@ class OllamaRepository:
         except Exception as e:
             raise Exception(f"Failed to get available models: {str(e)}")
 
+        _models_cache[self.base_url] = (time.monotonic() + MODELS_CACHE_TTL, model_infos)
+        return list(model_infos)
+
     async def categorize_models(self) -> Dict[str, List[str]]:
         """Categorize models into embedding, vision, and chat models"""
         try:
@@ -89,7 +112,7 @@ class OllamaRepository:
         }
 
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = _session.post(url, json=payload, timeout=30)
             response.raise_for_status()
 
             result = response.json()
@@ -113,13 +136,18 @@ class OllamaRepository:
         if model is None:
             model = self.default_embedding_model
 
-        if model in self._vector_size_cache:
-            return self._vector_size_cache[model]
+        known_size = KNOWN_EMBEDDING_DIMENSIONS.get(model.split(":", 1)[0])
+        if known_size is not None:
+            return known_size
+
+        cache_key = (self.base_url, model)
+        if cache_key in _vector_size_cache:
+            return _vector_size_cache[cache_key]
 
         sample_response = await self.get_text_embedding("Sample text for dimension detection", model)
         vector_size = len(sample_response.embedding)
 
-        self._vector_size_cache[model] = vector_size
+        _vector_size_cache[cache_key] = vector_size
 
         return vector_size
 
@@ -144,7 +172,7 @@ class OllamaRepository:
         }
 
         try:
-            response = requests.post(url, json=payload, timeout=120)
+            response = _session.post(url, json=payload, timeout=120)
             response.raise_for_status()
 
             result = response.json()
@@ -1,10 +1,121 @@
+import logging
 import os
+import time
 import uuid
-import requests
-from typing import Dict, Any, List, Optional
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from grpc import Compression, RpcError, StatusCode
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    Distance, VectorParams, PayloadSchemaType, PointStruct,
+    Filter, FieldCondition, MatchValue, MatchAny,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, HnswConfigDiff,
+    PayloadSelectorInclude, OptimizersConfigDiff
+)
 from ..models.document import DocumentChunk, CollectionInfo
+from ..utils.http_session import get_async_client
+
+logger = logging.getLogger(__name__)
+
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT__SERVICE__GRPC_PORT", "6334"))
+QDRANT_GRPC_GZIP = os.getenv("QDRANT_GRPC_GZIP", "true").strip().lower() in ("1", "true", "yes")
+UPSERT_BATCH_SIZE = 256
+FILE_SCROLL_PAGE_SIZE = 512
+# Uploads with at least this many points defer HNSW indexing until all of them are written
+BULK_UPLOAD_MIN_POINTS = 2048
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+_FILE_INFO_PAYLOAD_FIELDS = [
+    "metadata.file_id",
+    "metadata.file_path",
+    "metadata.filename",
+    "metadata.file_type",
+    "metadata.file_size",
+    "metadata.flow_id",
+    "metadata.includes_images",
+]
+
+# Collections this process has seen exist, mapped to when that knowledge expires, so membership
+# checks skip the round trip. The cache is per process and not shared between uvicorn workers,
+# so entries expire quickly and are dropped whenever an operation on the collection fails.
+KNOWN_COLLECTION_TTL = 30
+_known_collections: Dict[str, float] = {}
+_known_collections_lock = threading.Lock()
+
+# Collections with bulk uploads in flight: (number of uploads, indexing threshold to restore)
+_bulk_uploads: Dict[str, Tuple[int, int]] = {}
+_bulk_uploads_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _get_client(url: str) -> QdrantClient:
+    """Share one QdrantClient (and its connection pool) per Qdrant URL, talking gRPC"""
+    return QdrantClient(
+        url=url,
+        grpc_port=QDRANT_GRPC_PORT,
+        prefer_grpc=True,
+        # Upserts carry the chunk text in their payload, which compresses well
+        grpc_compression=Compression.Gzip if QDRANT_GRPC_GZIP else None
+    )
+
+
+def _remember_collection(collection_name: str) -> None:
+    with _known_collections_lock:
+        _known_collections[collection_name] = time.monotonic() + KNOWN_COLLECTION_TTL
+
+
+def _forget_collection(collection_name: str) -> None:
+    with _known_collections_lock:
+        _known_collections.pop(collection_name, None)
+
+
+def _is_known_collection(collection_name: str) -> bool:
+    with _known_collections_lock:
+        expires_at = _known_collections.get(collection_name)
+        if expires_at is None:
+            return False
+        if expires_at > time.monotonic():
+            return True
+        del _known_collections[collection_name]
+        return False
+
+
+def _is_not_found(error: Exception) -> bool:
+    """True if a Qdrant call failed because the collection does not exist (gRPC or REST)"""
+    if isinstance(error, RpcError):
+        return error.code() == StatusCode.NOT_FOUND
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    return False
+
+
+def _collection_exists_on_server(client: QdrantClient, collection_name: str) -> bool:
+    """
+    Check a collection with get_collection, which every Qdrant version serves.
+    The dedicated CollectionExists call needs Qdrant 1.8, newer than the pinned image.
+    """
+    try:
+        client.get_collection(collection_name)
+        return True
+    except Exception as e:
+        if _is_not_found(e):
+            return False
+        raise
+
+
+def _file_path_filter(file_path: str) -> Filter:
+    return Filter(must=[FieldCondition(key="metadata.file_path", match=MatchValue(value=file_path))])
+
+
+def _random_point_ids(count: int) -> List[str]:
+    """Generate random version-4 UUID strings from a single os.urandom call"""
+    random_bytes = os.urandom(16 * count)
+    return [
+        str(uuid.UUID(bytes=random_bytes[offset:offset + 16], version=4))
+        for offset in range(0, 16 * count, 16)
+    ]
 
 
 def get_collection_name(user_id: str, flow_id: str) -> str:
@@ -17,12 +128,12 @@ class QdrantRepository:
     def __init__(self):
         self.url = os.getenv("QDRANT_INTERNAL_URL", "http://qdrant:6333")
         self.collections_endpoint = os.getenv("QDRANT_COLLECTIONS_ENDPOINT", "/collections")
-        self.client = QdrantClient(url=self.url)
+        self.client = _get_client(self.url)
 
     async def check_connection(self) -> bool:
         """Check if Qdrant service is reachable"""
         try:
-            response = requests.get(f"{self.url}{self.collections_endpoint}", timeout=5)
+            response = await get_async_client().get(f"{self.url}{self.collections_endpoint}", timeout=5)
             return response.status_code == 200
         except Exception:
             return False
@@ -32,11 +143,28 @@ class QdrantRepository:
             collection_name = get_collection_name(user_id, flow_id)
             self.client.create_collection(
                 collection_name=collection_name,
+                # Full-precision vectors and the HNSW graph live on disk; only the
+                # int8-quantized copies are kept in RAM for search
                 vectors_config=VectorParams(
                     size=vector_size,
-                    distance=Distance.COSINE
+                    distance=Distance.COSINE,
+                    on_disk=True
+                ),
+                hnsw_config=HnswConfigDiff(on_disk=True),
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True
+                    )
                 )
             )
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name="metadata.content_hash",
+                field_schema=PayloadSchemaType.KEYWORD
+            )
+            _remember_collection(collection_name)
 
             collection_info = self.client.get_collection(collection_name)
             return CollectionInfo(
@@ -54,10 +182,9 @@ class QdrantRepository:
         """Delete a collection"""
         try:
             collection_name = get_collection_name(user_id, flow_id)
-            collections = self.client.get_collections().collections
-            collection_names = [c.name for c in collections]
+            _forget_collection(collection_name)
 
-            if collection_name not in collection_names:
+            if not _collection_exists_on_server(self.client, collection_name):
                 return True
 
             self.client.delete_collection(collection_name)
@@ -69,8 +196,13 @@ class QdrantRepository:
         """Check if collection exists"""
         try:
             collection_name = get_collection_name(user_id, flow_id)
-            collections = self.client.get_collections().collections
-            return collection_name in [c.name for c in collections]
+            if _is_known_collection(collection_name):
+                return True
+
+            exists = _collection_exists_on_server(self.client, collection_name)
+            if exists:
+                _remember_collection(collection_name)
+            return exists
         except Exception:
             return False
 
@@ -91,34 +223,94 @@ class QdrantRepository:
                 distance=collection_info.config.params.vectors.distance.name
             )
         except Exception as e:
+            _forget_collection(get_collection_name(user_id, flow_id))
             raise Exception(f"Failed to get collection info: {str(e)}")
 
     async def upload_documents(self, user_id: str, flow_id: str, chunks: List[DocumentChunk]) -> bool:
         """Upload document chunks to collection"""
         try:
             collection_name = get_collection_name(user_id, flow_id)
-            points = []
-            for chunk in chunks:
-                point_id = str(uuid.uuid4())
-                points.append({
-                    "id": point_id,
-                    "vector": chunk.embedding,
-                    "payload": {
+            point_ids = _random_point_ids(len(chunks))
+            points = [
+                PointStruct(
+                    id=point_id,
+                    vector=chunk.embedding,
+                    payload={
                         "page_content": chunk.content,
-                        "metadata": chunk.metadata
+                        "metadata": chunk.metadata.model_dump(mode="json")
                     }
-                })
-
-            if points:
-                self.client.upsert(
-                    collection_name=collection_name,
-                    points=points
                 )
-                return True
-            return False
+                for point_id, chunk in zip(point_ids, chunks)
+            ]
+
+            if not points:
+                return False
+
+            is_bulk_upload = len(points) >= BULK_UPLOAD_MIN_POINTS
+            if is_bulk_upload:
+                self._begin_bulk_upload(collection_name)
+
+            try:
+                # Upsert in bounded pages; only the last one waits until everything is applied
+                for start in range(0, len(points), UPSERT_BATCH_SIZE):
+                    is_last_page = start + UPSERT_BATCH_SIZE >= len(points)
+                    self.client.upsert(
+                        collection_name=collection_name,
+                        points=points[start:start + UPSERT_BATCH_SIZE],
+                        wait=is_last_page
+                    )
+            finally:
+                if is_bulk_upload:
+                    self._end_bulk_upload(collection_name)
+            return True
         except Exception as e:
+            _forget_collection(get_collection_name(user_id, flow_id))
             raise Exception(f"Failed to upload documents: {str(e)}")
 
+    def begin_bulk_upload(self, user_id: str, flow_id: str) -> None:
+        """
+        Defer HNSW indexing across several upload_documents calls to one collection,
+        e.g. a large file uploaded in batches. Every call must be paired with end_bulk_upload.
+        """
+        self._begin_bulk_upload(get_collection_name(user_id, flow_id))
+
+    def end_bulk_upload(self, user_id: str, flow_id: str) -> None:
+        """Finish a bulk upload started with begin_bulk_upload"""
+        self._end_bulk_upload(get_collection_name(user_id, flow_id))
+
+    def _begin_bulk_upload(self, collection_name: str) -> None:
+        """
+        Disable HNSW indexing while a large upload runs, so Qdrant builds the index
+        once afterwards instead of re-indexing segments as points arrive.
+        Overlapping uploads to one collection share the disabled state.
+        """
+        with _bulk_uploads_lock:
+            active_uploads, restore_threshold = _bulk_uploads.get(collection_name, (0, DEFAULT_INDEXING_THRESHOLD))
+            if active_uploads == 0:
+                optimizer_config = self.client.get_collection(collection_name).config.optimizer_config
+                restore_threshold = optimizer_config.indexing_threshold or DEFAULT_INDEXING_THRESHOLD
+                self.client.update_collection(
+                    collection_name=collection_name,
+                    optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+                )
+            _bulk_uploads[collection_name] = (active_uploads + 1, restore_threshold)
+
+    def _end_bulk_upload(self, collection_name: str) -> None:
+        """Restore the indexing threshold once the last bulk upload to a collection finishes"""
+        with _bulk_uploads_lock:
+            active_uploads, restore_threshold = _bulk_uploads.pop(collection_name, (1, DEFAULT_INDEXING_THRESHOLD))
+            if active_uploads > 1:
+                _bulk_uploads[collection_name] = (active_uploads - 1, restore_threshold)
+                return
+
+            try:
+                self.client.update_collection(
+                    collection_name=collection_name,
+                    optimizers_config=OptimizersConfigDiff(indexing_threshold=restore_threshold)
+                )
+            except Exception as e:
+                logger.warning("Failed to restore indexing threshold for %s: %s", collection_name, e)
+
     async def delete_documents_by_file_path(self, user_id: str, flow_id: str, file_path: str) -> int:
         """Delete all documents from a specific file"""
         try:
@@ -128,14 +320,7 @@ class QdrantRepository:
             while True:
                 points, next_page_offset = self.client.scroll(
                     collection_name=collection_name,
-                    scroll_filter={
-                        "must": [
-                            {
-                                "key": "metadata.file_path",
-                                "match": {"value": file_path}
-                            }
-                        ]
-                    },
+                    scroll_filter=_file_path_filter(file_path),
                     with_payload=False,
                     with_vectors=False,
                     limit=100
@@ -159,6 +344,7 @@ class QdrantRepository:
             return total_deleted
 
         except Exception as e:
+            _forget_collection(get_collection_name(user_id, flow_id))
             print(f"Error in delete_documents_by_file_path: {e}")
             raise Exception(f"Failed to delete documents: {str(e)}")
 
@@ -168,20 +354,56 @@ class QdrantRepository:
             collection_name = get_collection_name(user_id, flow_id)
             response = self.client.scroll(
                 collection_name=collection_name,
-                scroll_filter={
-                    "must": [
-                        {
-                            "key": "metadata.file_path",
-                            "match": {"value": file_path}
-                        }
-                    ]
-                },
+                scroll_filter=_file_path_filter(file_path),
                 limit=1
             )
             return len(response[0]) > 0
         except Exception:
+            _forget_collection(get_collection_name(user_id, flow_id))
             return False
 
+    async def get_vectors_by_content_hash(self, user_id: str, flow_id: str,
+                                          content_hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up stored vectors for chunks whose content hash is already in the collection
+
+        Returns:
+            Mapping of content hash to a stored vector, only for hashes that were found
+        """
+        collection_name = get_collection_name(user_id, flow_id)
+        vectors_by_hash: Dict[str, List[float]] = {}
+        unique_hashes = list(dict.fromkeys(content_hashes))
+
+        for start in range(0, len(unique_hashes), 256):
+            hash_batch = unique_hashes[start:start + 256]
+            offset = None
+
+            while True:
+                try:
+                    points, offset = self.client.scroll(
+                        collection_name=collection_name,
+                        scroll_filter=Filter(must=[
+                            FieldCondition(key="metadata.content_hash", match=MatchAny(any=hash_batch))
+                        ]),
+                        with_payload=["metadata.content_hash"],
+                        with_vectors=True,
+                        limit=256,
+                        offset=offset
+                    )
+                except Exception:
+                    _forget_collection(collection_name)
+                    raise
+
+                for point in points:
+                    content_hash = point.payload.get("metadata", {}).get("content_hash")
+                    if content_hash and point.vector:
+                        vectors_by_hash.setdefault(content_hash, point.vector)
+
+                if offset is None:
+                    break
+
+        return vectors_by_hash
+
     async def get_files_in_collection(self, user_id: str, flow_id: str) -> List[Dict[str, Any]]:
         """Get all unique files in a collection"""
         try:
@@ -189,21 +411,25 @@ class QdrantRepository:
                 return []
 
             collection_name = get_collection_name(user_id, flow_id)
+            file_info_by_path = {}
+            offset = None
 
-            response = self.client.scroll(
-                collection_name=collection_name,
-                scroll_filter={},
-                with_payload=True,
-                with_vectors=False,
-                limit=1000
-            )
+            # Page through every point, shipping only the metadata fields listed below
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=collection_name,
+                    with_payload=PayloadSelectorInclude(include=_FILE_INFO_PAYLOAD_FIELDS),
+                    with_vectors=False,
+                    limit=FILE_SCROLL_PAGE_SIZE,
+                    offset=offset
+                )
 
-            file_info_by_path = {}
-            for point in response[0]:
-                if "metadata" in point.payload:
-                    metadata = point.payload["metadata"]
-                    file_path = metadata.get("file_path")
+                for point in points:
+                    metadata = (point.payload or {}).get("metadata")
+                    if not metadata:
+                        continue
 
+                    file_path = metadata.get("file_path")
                     if file_path and file_path not in file_info_by_path:
                         file_info_by_path[file_path] = {
                             "file_id": metadata.get("file_id"),
@@ -215,6 +441,10 @@ class QdrantRepository:
                             "includes_images": metadata.get("includes_images", False)
                         }
 
+                if offset is None:
+                    break
+
             return list(file_info_by_path.values())
         except Exception as e:
+            _forget_collection(get_collection_name(user_id, flow_id))
             raise Exception(f"Failed to get files in collection: {str(e)}")
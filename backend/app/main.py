@@ -1,4 +1,9 @@
+import asyncio
+import logging
+import os
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -8,13 +13,22 @@ from .api.routes.redirect import router as redirect_router
 from .api.routes.flow import router as flow_router
 from .api.routes.message import router as apikey_router
 from .api.routes.collections import router as qdrant_router
+from .utils.http_session import close_async_client
+from .utils.processing_tracker import processing_tracker
 
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("BACKEND_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
 app = FastAPI(
     title="LangflowSetupBackend",
     description="A backend API to extend Langflow",
     version="1.0.0",
+    # Routers keep FastAPI's default response class unless set, so they inherit orjson encoding
+    default_response_class=ORJSONResponse,
 )
 
 ENV = "dev"
@@ -48,6 +62,32 @@ app.include_router(flow_router)
 app.include_router(apikey_router)
 app.include_router(qdrant_router)
 
+TRACKER_STALE_HOURS = float(os.getenv("TRACKER_STALE_HOURS", "24"))
+TRACKER_CLEANUP_INTERVAL = int(os.getenv("TRACKER_CLEANUP_INTERVAL", "3600"))
+
+logger = logging.getLogger(__name__)
+
+
+async def _cleanup_processing_tracker():
+    """Periodically drop tracker entries whose background task never removed them"""
+    while True:
+        await asyncio.sleep(TRACKER_CLEANUP_INTERVAL)
+        try:
+            processing_tracker.cleanup_stale_files(TRACKER_STALE_HOURS)
+        except Exception:
+            logger.exception("Processing tracker cleanup failed")
+
+
+@app.on_event("startup")
+async def startup():
+    app.state.tracker_cleanup_task = asyncio.create_task(_cleanup_processing_tracker())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.tracker_cleanup_task.cancel()
+    await close_async_client()
+
 
 @app.get("/")
 async def root():
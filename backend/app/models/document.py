@@ -14,6 +14,7 @@ class DocumentMetadata(BaseModel):
     file_size: int
     includes_images: bool = False
     uploaded_at: Optional[datetime] = None
+    content_hash: Optional[str] = None
 
 
 class DocumentChunk(BaseModel):
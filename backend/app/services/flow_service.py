@@ -1,15 +1,16 @@
 import os
 import uuid
-import shutil
 import json
+import hashlib
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 import asyncio
+from itertools import islice
 from fastapi import Request, UploadFile, BackgroundTasks
 from datetime import datetime
 
 from ..external.langflow_repository import LangflowRepository
-from ..external.qdrant_repository import QdrantRepository, get_collection_name
+from ..external.qdrant_repository import QdrantRepository, get_collection_name, BULK_UPLOAD_MIN_POINTS
 from ..external.ollama_repository import OllamaRepository
 from ..models.flow import (
     Flow, FlowDeletionResult, FlowExecutionResult,
@@ -22,9 +23,17 @@ from ..models.document import (
 )
 from ..utils.jwt_helper import get_user_id_from_request, get_user_token, get_admin_token
 from ..utils.processing_tracker import processing_tracker
-from ..utils.file_content_extraction import read_file_content, get_text_embedding
+from ..utils.text_chunking import iter_chunks, iter_file_chunks
+from ..utils.upload_storage import save_upload_file
+from ..utils.file_content_extraction import (
+    read_file_content, detect_file_type_from_header, get_text_embedding, get_text_embeddings,
+    EMBED_BATCH_SIZE, FILE_TYPE_HEADER_SIZE
+)
 
 BACKEND_UPLOAD_DIR = os.getenv("BACKEND_UPLOAD_DIR", "/tmp/uploads")
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+# Chunks hashed, embedded and uploaded together; bounds the chunk texts and vectors held per file
+INGEST_BATCH_CHUNKS = int(os.getenv("INGEST_BATCH_CHUNKS", "512"))
 LANGFLOW_URL = os.getenv('LANGFLOW_URL')
 
 
@@ -238,7 +247,7 @@ class FlowService:
             else:
                 results["error_count"] += 1
 
-            results["results"].append(deletion_result.dict())
+            results["results"].append(deletion_result.model_dump())
 
         return results
 
@@ -492,15 +501,16 @@ class FlowService:
 
         files = []
         for file_data in files_data:
+            file_id = file_data.get("file_id", "")
             file_info = FileInfo(
-                file_id=file_data.get("file_id", ""),
+                file_id=file_id,
                 file_path=file_data.get("file_path", ""),
                 file_name=file_data.get("file_name", ""),
                 file_type=file_data.get("file_type", ""),
                 flow_id=flow_id,
                 file_size=file_data.get("file_size"),
                 includes_images=file_data.get("includes_images", True),
-                processing=processing_tracker.is_processing(file_data.get("file_id", ""))
+                processing=processing_tracker.is_processing(file_id)
             )
             files.append(file_info)
 
@@ -542,45 +552,50 @@ class FlowService:
         if not await self.qdrant_repo.collection_exists(user_id, flow_id):
             raise ValueError(f"Collection for flow '{flow_id}' not found. Please create the collection first.")
 
+        # Sniff the upload before anything is written, so unsupported files never hit the disk
+        header = await file.read(FILE_TYPE_HEADER_SIZE)
+        await file.seek(0)
+        file_type = detect_file_type_from_header(file.filename, header)
+        if file_type == 'unknown':
+            raise ValueError(f"Unsupported file type for '{file.filename}'")
+
         upload_dir = Path(BACKEND_UPLOAD_DIR) / flow_id
-        upload_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(upload_dir.mkdir, parents=True, exist_ok=True)
 
         file_id = str(uuid.uuid4())
         safe_filename = f"{file_id}_{file.filename}"
         file_path = upload_dir / safe_filename
 
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            file_size = await save_upload_file(file, file_path)
         except Exception as e:
             raise ValueError(f"Failed to save file: {str(e)}")
 
         if await self.qdrant_repo.check_file_exists(user_id, flow_id, str(file_path)):
-            file_path.unlink(missing_ok=True)
+            await asyncio.to_thread(file_path.unlink, missing_ok=True)
             raise ValueError(f"File '{file.filename}' already exists in collection for flow '{flow_id}'")
 
         print(f"✅ File saved to: {file_path}")
-        print(f"📁 File size: {file_path.stat().st_size} bytes")
-
-        file_size = file_path.stat().st_size
+        print(f"📁 File size: {file_size} bytes")
 
         file_info = FileInfo(
             file_id=file_id,
             file_path=str(file_path),
             file_name=file.filename,
-            file_type="unknown",
+            file_type=file_type,
             flow_id=flow_id,
             file_size=file_size,
             includes_images=include_images,
             processing=True
         )
 
-        processing_tracker.add_file(file_id, file_info.dict())
+        processing_tracker.add_file(file_id, file_info.model_dump())
 
         background_tasks.add_task(
             self._process_file_background_wrapper,
             file_path=str(file_path),
             file_name=file.filename,
+            file_type=file_type,
             file_size=file_size,
             file_id=file_id,
             user_id=user_id,
@@ -602,6 +617,7 @@ class FlowService:
             self,
             file_path: str,
             file_name: str,
+            file_type: str,
             file_size: int,
             file_id: str,
             user_id: str,
@@ -616,7 +632,7 @@ class FlowService:
         """
         try:
             asyncio.run(self._process_file_background_async(
-                file_path, file_name, file_size, file_id, user_id, flow_id,
+                file_path, file_name, file_type, file_size, file_id, user_id, flow_id,
                 chunk_size, chunk_overlap, include_images
             ))
         except Exception as e:
@@ -630,10 +646,124 @@ class FlowService:
             except:
                 pass
 
+    def _embed_batch(self, batch: List[str], batch_start: int) -> List[Optional[List[float]]]:
+        """
+        Embed one batch of chunks, retrying chunk by chunk if the batch request fails.
+        Chunks that cannot be embedded get None.
+        """
+        try:
+            return get_text_embeddings(batch)
+        except Exception as e:
+            print(f"⚠️ Batch embedding failed, embedding chunks one by one: {e}")
+
+        embeddings = []
+        for chunk_idx, chunk in enumerate(batch, start=batch_start):
+            try:
+                embeddings.append(get_text_embedding(chunk))
+            except Exception as e:
+                print(f"❌ Error processing chunk {chunk_idx}: {e}")
+                embeddings.append(None)
+        return embeddings
+
+    async def _embed_chunks(self, chunks: List[str], file_id: str,
+                            first_chunk_idx: int = 0) -> List[Optional[List[float]]]:
+        """
+        Embed all chunks in batches, keeping up to EMBED_CONCURRENCY batch requests in flight
+
+        Args:
+            chunks: Chunk texts to embed
+            file_id: Processing tracker entry to report progress to
+            first_chunk_idx: Position of the first chunk in the file, for progress reporting
+
+        Returns:
+            One embedding per chunk (None for chunks that failed), in chunk order
+        """
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+        async def embed(batch_start: int) -> List[Optional[List[float]]]:
+            batch = chunks[batch_start:batch_start + EMBED_BATCH_SIZE]
+            async with semaphore:
+                first_chunk = first_chunk_idx + batch_start + 1
+                print(f"⚡ Processing chunks {first_chunk}-{first_chunk + len(batch) - 1}")
+                processing_tracker.update_file(file_id, {
+                    "current_chunk": first_chunk
+                })
+                return await asyncio.to_thread(self._embed_batch, batch, batch_start)
+
+        batches = await asyncio.gather(*(
+            embed(batch_start) for batch_start in range(0, len(chunks), EMBED_BATCH_SIZE)
+        ))
+        return [embedding for batch in batches for embedding in batch]
+
+    async def _build_document_chunks(
+            self,
+            chunks: List[str],
+            first_chunk_idx: int,
+            file_path: str,
+            file_name: str,
+            file_type: str,
+            file_size: int,
+            file_id: str,
+            user_id: str,
+            flow_id: str,
+            include_images: bool
+    ) -> List[DocumentChunk]:
+        """
+        Embed one batch of a file's chunks and wrap them as document chunks.
+        Chunks whose exact text is already stored in the collection reuse that vector.
+
+        Returns:
+            Document chunks for every chunk that could be embedded, in chunk order
+        """
+        content_hashes = [hashlib.sha256(chunk.encode("utf-8")).hexdigest() for chunk in chunks]
+
+        try:
+            stored_vectors = await self.qdrant_repo.get_vectors_by_content_hash(
+                user_id, flow_id, content_hashes
+            )
+        except Exception as e:
+            print(f"⚠️ Could not look up existing chunk vectors: {e}")
+            stored_vectors = {}
+
+        embeddings = [stored_vectors.get(content_hash) for content_hash in content_hashes]
+        missing = [idx for idx, embedding in enumerate(embeddings) if embedding is None]
+        print(f"♻️ Reusing {len(chunks) - len(missing)} stored chunk vectors")
+
+        new_embeddings = await self._embed_chunks([chunks[idx] for idx in missing], file_id, first_chunk_idx)
+        for idx, embedding in zip(missing, new_embeddings):
+            embeddings[idx] = embedding
+
+        document_chunks = []
+        for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            if embedding is None:
+                continue
+
+            metadata = DocumentMetadata(
+                file_path=file_path,
+                file_id=file_id,
+                file_size=file_size,
+                filename=file_name,
+                file_type=file_type,
+                flow_id=flow_id,
+                chunk_idx=first_chunk_idx + idx,
+                includes_images=include_images,
+                uploaded_at=datetime.utcnow(),
+                content_hash=content_hashes[idx]
+            )
+
+            document_chunks.append(DocumentChunk(
+                content=chunk,
+                embedding=embedding,
+                metadata=metadata
+            ))
+
+        return document_chunks
+
     async def _process_file_background_async(
             self,
             file_path: str,
             file_name: str,
+            file_type: str,
             file_size: int,
             file_id: str,
             user_id: str,
@@ -650,9 +780,11 @@ class FlowService:
             processing_tracker.update_file(file_id, {"status": "reading_file"})
 
             try:
-                content, file_type = read_file_content(file_path, include_images)
+                content = None
+                if file_type != 'text':
+                    content, file_type = read_file_content(file_path, include_images, file_type)
+                    print(f"📊 Content length: {len(content)} characters")
                 print(f"📄 File type detected: {file_type}")
-                print(f"📊 Content length: {len(content)} characters")
             except Exception as e:
                 raise ValueError(f"Failed to read file content: {str(e)}")
 
@@ -661,73 +793,75 @@ class FlowService:
                 "status": "creating_chunks"
             })
 
-            chunks = []
-            for i in range(0, len(content), chunk_size - chunk_overlap):
-                chunk = content[i:i + chunk_size]
-                if chunk.strip():
-                    chunks.append(chunk)
-
-            print(f"Created {len(chunks)} chunks")
-            processing_tracker.update_file(file_id, {
-                "status": "generating_embeddings",
-                "total_chunks": len(chunks)
-            })
+            def open_chunks():
+                if content is None:
+                    # Plain text is chunked straight from disk instead of being loaded as one string
+                    return iter_file_chunks(file_path, chunk_size, chunk_overlap)
+                return iter_chunks(content, chunk_size, chunk_overlap)
+
+            # A counting pass keeps no chunk texts but lets progress report a fixed total
+            total_chunks = sum(1 for _ in open_chunks())
+            print(f"Created {total_chunks} chunks")
+
+            # Chunks are hashed, embedded and uploaded INGEST_BATCH_CHUNKS at a time,
+            # so only one batch of chunk texts and vectors is held however large the file is
+            chunk_iter = open_chunks()
+            next_chunk_idx = 0
+            chunks_uploaded = 0
+            bulk_upload = False
+            try:
+                while True:
+                    chunks = list(islice(chunk_iter, INGEST_BATCH_CHUNKS))
+                    if not chunks:
+                        break
 
-            document_chunks = []
-            for chunk_idx, chunk in enumerate(chunks):
-                if chunk_idx % 5 == 0:
-                    print(f"⚡ Processing chunk {chunk_idx + 1}/{len(chunks)}")
+                    first_chunk_idx = next_chunk_idx
+                    next_chunk_idx += len(chunks)
                     processing_tracker.update_file(file_id, {
-                        "current_chunk": chunk_idx + 1
+                        "status": "generating_embeddings",
+                        "total_chunks": total_chunks
                     })
 
-                try:
-                    embedding = get_text_embedding(chunk)
-
-                    metadata = DocumentMetadata(
-                        file_path=file_path,
-                        file_id=file_id,
-                        file_size=file_size,
-                        filename=file_name,
-                        file_type=file_type,
-                        flow_id=flow_id,
-                        chunk_idx=chunk_idx,
-                        includes_images=include_images,
-                        uploaded_at=datetime.utcnow()
-                    )
-
-                    doc_chunk = DocumentChunk(
-                        content=chunk,
-                        embedding=embedding,
-                        metadata=metadata
+                    document_chunks = await self._build_document_chunks(
+                        chunks, first_chunk_idx, file_path, file_name, file_type, file_size,
+                        file_id, user_id, flow_id, include_images
                     )
-                    document_chunks.append(doc_chunk)
-
-                except Exception as e:
-                    print(f"❌ Error processing chunk {chunk_idx}: {e}")
-                    continue
-
-            if not document_chunks:
+                    if not document_chunks:
+                        continue
+
+                    # Large files defer HNSW indexing until their last batch is written
+                    if not bulk_upload and total_chunks >= BULK_UPLOAD_MIN_POINTS:
+                        self.qdrant_repo.begin_bulk_upload(user_id, flow_id)
+                        bulk_upload = True
+
+                    processing_tracker.update_file(file_id, {"status": "uploading_to_qdrant"})
+                    if not await self.qdrant_repo.upload_documents(user_id, flow_id, document_chunks):
+                        raise ValueError("Failed to upload chunks to Qdrant")
+
+                    chunks_uploaded += len(document_chunks)
+                    processing_tracker.update_file(file_id, {"chunks_created": chunks_uploaded})
+            except Exception:
+                # Earlier batches are already stored; remove them so a failed file leaves nothing behind
+                if chunks_uploaded:
+                    try:
+                        await self.qdrant_repo.delete_documents_by_file_path(user_id, flow_id, file_path)
+                    except Exception as e:
+                        print(f"⚠️ Could not remove partially uploaded chunks of {file_path}: {e}")
+                raise
+            finally:
+                if bulk_upload:
+                    self.qdrant_repo.end_bulk_upload(user_id, flow_id)
+
+            if not chunks_uploaded:
                 raise ValueError("No valid chunks were created from the file")
 
-            print(f"🎯 Successfully created {len(document_chunks)} document chunks")
-            processing_tracker.update_file(file_id, {
-                "status": "uploading_to_qdrant",
-                "chunks_created": len(document_chunks)
-            })
-
-            success = await self.qdrant_repo.upload_documents(user_id, flow_id, document_chunks)
-
-            if success:
-                print(f"✅ Successfully uploaded {len(document_chunks)} chunks to Qdrant")
-                processing_tracker.remove_file(file_id)
-                try:
-                    Path(file_path).unlink(missing_ok=True)
-                    print(f"🗑️ Cleaned up file: {file_path}")
-                except Exception as e:
-                    print(f"⚠️ Could not delete file {file_path}: {e}")
-            else:
-                raise ValueError("Failed to upload chunks to Qdrant")
+            print(f"✅ Successfully uploaded {chunks_uploaded} chunks to Qdrant")
+            processing_tracker.remove_file(file_id)
+            try:
+                Path(file_path).unlink(missing_ok=True)
+                print(f"🗑️ Cleaned up file: {file_path}")
+            except Exception as e:
+                print(f"⚠️ Could not delete file {file_path}: {e}")
 
         except Exception as e:
             print(f"❌ Error processing file in background: {e}")
@@ -778,13 +912,14 @@ class FlowService:
         file_path = file_info.get("file_path")
         if file_path:
             file_path_obj = Path(file_path)
-            if file_path_obj.exists():
-                try:
-                    file_path_obj.unlink()
-                    print(f"Deleted physical processing file: {file_path_obj}")
-                    physical_file_deleted = True
-                except Exception as e:
-                    print(f"Warning: Could not delete physical processing file {file_path_obj}: {e}")
+            try:
+                await asyncio.to_thread(file_path_obj.unlink)
+                print(f"Deleted physical processing file: {file_path_obj}")
+                physical_file_deleted = True
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Warning: Could not delete physical processing file {file_path_obj}: {e}")
 
         processing_tracker.remove_file(file_id)
 
@@ -831,13 +966,14 @@ class FlowService:
         # Delete physical file
         physical_file_deleted = False
         file_path_obj = Path(file_path)
-        if file_path_obj.exists():
-            try:
-                file_path_obj.unlink()
-                print(f"Deleted physical file: {file_path_obj}")
-                physical_file_deleted = True
-            except Exception as e:
-                print(f"Warning: Could not delete physical file {file_path_obj}: {e}")
+        try:
+            await asyncio.to_thread(file_path_obj.unlink)
+            print(f"Deleted physical file: {file_path_obj}")
+            physical_file_deleted = True
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: Could not delete physical file {file_path_obj}: {e}")
 
         collection_name = get_collection_name(user_id, flow_id)
 
@@ -878,5 +1014,5 @@ class FlowService:
         return {
             "success": True,
             "flow_id": flow_id,
-            "collection": collection_info.dict() if collection_info else None
+            "collection": collection_info.model_dump() if collection_info else None
         }
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 from typing import Dict, Any
 from ..external.ollama_repository import OllamaRepository
@@ -14,9 +15,12 @@ class HealthService:
 
     async def get_system_health(self) -> Dict[str, Any]:
         """Get overall system health with all service statuses"""
-        ollama_status = await self.check_ollama_health()
-        qdrant_status = await self.check_qdrant_health()
-        langflow_status = await self.check_langflow_health()
+        # The checks are independent, so the endpoint only waits for the slowest one
+        ollama_status, qdrant_status, langflow_status = await asyncio.gather(
+            self.check_ollama_health(),
+            self.check_qdrant_health(),
+            self.check_langflow_health()
+        )
 
         all_healthy = all([
             ollama_status.is_healthy,
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import time
 import os
@@ -13,6 +14,7 @@ from ..external.langflow_repository import LangflowRepository
 from ..models.message import MessageRequest, MessageResponse, SessionInfo, ChatSession
 from ..utils.jwt_helper import get_user_id_from_request, get_user_info_from_request
 from ..utils.file_content_extraction import read_file_content
+from ..utils.upload_storage import save_upload_file
 
 
 class MessageService:
@@ -89,16 +91,16 @@ class MessageService:
 
         print(f"Processing {len(attached_files)} attached files...")
 
-        file_contents = []
-        base64_files = []
-        for file in attached_files:
-            if not file.filename:
-                continue
+        named_files = [file for file in attached_files if file.filename]
 
-            file_content = await self._process_single_file(file, include_images)
-            if file_content:
-                file_contents.append(file_content)
+        # Each extraction runs in its own worker thread, so attachments are processed concurrently
+        processed_contents = await asyncio.gather(*(
+            self._process_single_file(file, include_images) for file in named_files
+        ))
+        file_contents = [file_content for file_content in processed_contents if file_content]
 
+        base64_files = []
+        for file in named_files:
             await file.seek(0)
             content = await file.read()
             b64_encoded = base64.b64encode(content).decode('utf-8')
@@ -128,20 +130,20 @@ class MessageService:
         try:
             file_id = str(uuid.uuid4())
             temp_dir = Path(tempfile.gettempdir()) / "message_uploads"
-            temp_dir.mkdir(exist_ok=True)
+            await asyncio.to_thread(temp_dir.mkdir, exist_ok=True)
             temp_file_path = temp_dir / f"{file_id}_{file.filename}"
 
-            with open(temp_file_path, "wb") as temp_file:
-                content = await file.read()
-                temp_file.write(content)
+            file_size = await save_upload_file(file, temp_file_path)
 
             try:
-                file_content, file_type = read_file_content(
+                # Extraction reads and parses the whole file, so keep it off the event loop
+                file_content, file_type = await asyncio.to_thread(
+                    read_file_content,
                     str(temp_file_path),
                     include_images=include_images
                 )
 
-                file_header = f"\n\n--- FILE: {file.filename} (Type: {file_type}, Size: {len(content)} bytes) ---\n"
+                file_header = f"\n\n--- FILE: {file.filename} (Type: {file_type}, Size: {file_size} bytes) ---\n"
                 formatted_content = file_header + file_content
 
                 print(f"✅ Successfully processed file: {file.filename} ({file_type})")
@@ -154,7 +156,7 @@ class MessageService:
 
             finally:
                 try:
-                    temp_file_path.unlink(missing_ok=True)
+                    await asyncio.to_thread(temp_file_path.unlink, missing_ok=True)
                 except Exception as e:
                     print(f"Warning: Could not delete temp file {temp_file_path}: {e}")
 
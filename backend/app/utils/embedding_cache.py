@@ -0,0 +1,78 @@
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def compute_embedding_key(model: str, text: str) -> str:
+    """Fingerprint of an embedding: the model name and the exact input text"""
+    return hashlib.blake2b(f"{model}|{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of embedding vectors, stored as compact double arrays.
+    The cache lives in process memory: every uvicorn worker has its own, and it is empty after a restart.
+    """
+    def __init__(self, max_size: int = 5000):
+        self._cache: OrderedDict[str, array] = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self._hits = 0
+        self._misses = 0
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Look up several keys at once; misses are returned as None"""
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                    results.append(vector.tolist())
+                else:
+                    self._misses += 1
+                    results.append(None)
+        return results
+
+    def store(self, key: str, embedding: List[float]) -> None:
+        """Store an embedding vector"""
+        vector = array("d", embedding)
+        evicted_key = None
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            elif len(self._cache) >= self.max_size:
+                evicted_key, _ = self._cache.popitem(last=False)
+            self._cache[key] = vector
+
+        if evicted_key:
+            logger.debug("Evicted LRU embedding from cache: %s...", evicted_key[:12])
+
+    def clear(self) -> None:
+        """Clear all cached embeddings"""
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            size = len(self._cache)
+            hits = self._hits
+            misses = self._misses
+
+        hit_rate = hits / (hits + misses) if (hits + misses) > 0 else 0
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hit_rate * 100, 2)
+        }
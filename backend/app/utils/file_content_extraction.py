@@ -1,7 +1,12 @@
-import hashlib
+import io
+import logging
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 import base64
-import tempfile
 import fitz
 import zipfile
 from docx import Document
@@ -9,22 +14,93 @@ import PyPDF2
 import mimetypes
 from pptx import Presentation
 from openpyxl import load_workbook
+from PIL import Image
 import requests
 from typing import List, Dict, Any, Optional, Tuple, Set
 
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+from .embedding_cache import EmbeddingCache, compute_embedding_key
+from .http_session import create_session
 from .image_description_cache import ImageDescriptionCache, compute_image_hash
 from ..external.gemini_api import get_gemini_description
 
+logger = logging.getLogger(__name__)
+
 OLLAMA_URL = os.getenv("OLLAMA_INTERNAL_URL")
 DEFAULT_EMBEDDING_MODEL = os.getenv("DEFAULT_EMBEDDING_MODEL")
 DEFAULT_VISION_MODEL = os.getenv("DEFAULT_VISION_MODEL")
-USE_GOOGLE_VISION = os.getenv("USE_GOOGLE_VISION")
+USE_GOOGLE_VISION = os.getenv("USE_GOOGLE_VISION", "").strip().lower() in ("1", "true", "yes")
 
 OLLAMA_EMBEDDINGS_ENDPOINT = os.getenv("OLLAMA_EMBEDDINGS_ENDPOINT")
+OLLAMA_EMBED_ENDPOINT = os.getenv("OLLAMA_EMBED_ENDPOINT", "/api/embed")
 OLLAMA_GENERATE_ENDPOINT = os.getenv("OLLAMA_GENERATE_ENDPOINT")
 OLLAMA_TAGS_ENDPOINT = os.getenv("OLLAMA_TAGS_ENDPOINT")
 
-IMAGE_TIMEOUT = int(os.getenv("IMAGE_TIMEOUT"))
+OLLAMA_EMBEDDINGS_URL = f"{OLLAMA_URL}{OLLAMA_EMBEDDINGS_ENDPOINT}"
+OLLAMA_EMBED_URL = f"{OLLAMA_URL}{OLLAMA_EMBED_ENDPOINT}"
+OLLAMA_GENERATE_URL = f"{OLLAMA_URL}{OLLAMA_GENERATE_ENDPOINT}"
+OLLAMA_TAGS_URL = f"{OLLAMA_URL}{OLLAMA_TAGS_ENDPOINT}"
+
+IMAGE_TIMEOUT = int(os.getenv("IMAGE_TIMEOUT", "300"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_BATCH_TIMEOUT = 120
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "5000"))
+MAX_IMAGE_WIDTH = int(os.getenv("MAX_IMAGE_WIDTH", "1024"))
+MAX_IMAGE_HEIGHT = int(os.getenv("MAX_IMAGE_HEIGHT", "1024"))
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "85"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "20"))
+PDF_MAX_WORKERS = min(os.cpu_count() or 1, 4)
+PDF_PARALLEL_TIMEOUT = int(os.getenv("PDF_PARALLEL_TIMEOUT", "120"))
+
+# Image formats picked up from the media folders of DOCX/XLSX archives
+ZIP_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff')
+
+
+_ollama_session = create_session()
+
+# Worker processes for PDF text extraction, shared by all uploads and started on first use.
+# They are spawned rather than forked: the backend runs many threads, and a forked child
+# could inherit a lock one of them holds and hang.
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+_pdf_executor_lock = threading.Lock()
+
+
+def _ollama_post(url: str, payload: Dict[str, Any], timeout: int) -> Any:
+    """
+    POST a JSON payload to Ollama over the shared session and return the decoded response
+
+    Raises:
+        ValueError: If the request times out, cannot connect or Ollama returns an error
+    """
+    model = payload.get("model")
+
+    try:
+        response = _ollama_session.post(url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    except requests.exceptions.Timeout:
+        logger.warning("Timeout connecting to Ollama API at %s", url)
+        raise ValueError(f"Timeout connecting to Ollama API (model: {model})")
+
+    except requests.exceptions.ConnectionError:
+        logger.warning("Connection error to Ollama API at %s", url)
+        raise ValueError(f"Cannot connect to Ollama API at {OLLAMA_URL} (model: {model})")
+
+    except requests.exceptions.RequestException as e:
+        logger.warning("Request error connecting to Ollama API: %s", e)
+        if e.response is not None:
+            try:
+                error_detail = e.response.json()
+            except ValueError:
+                error_detail = e.response.text
+            raise ValueError(f"Ollama API error: {error_detail}")
+        raise ValueError(f"Error connecting to Ollama API: {str(e)}")
 
 
 def get_text_embedding(text: str) -> List[float]:
@@ -40,7 +116,7 @@ def get_text_embedding(text: str) -> List[float]:
     Raises:
         ValueError: If embedding request fails or returns invalid data
     """
-    url = f"{OLLAMA_URL}{OLLAMA_EMBEDDINGS_ENDPOINT}"
+    url = OLLAMA_EMBEDDINGS_URL
     model = DEFAULT_EMBEDDING_MODEL
 
     payload = {
@@ -49,12 +125,8 @@ def get_text_embedding(text: str) -> List[float]:
     }
 
     try:
-        print(f"Requesting embedding from {url} with model: {model}")
-        response = requests.post(url, json=payload, timeout=30)
-        response.raise_for_status()
-
-        result = response.json()
-        print(f"Ollama API response status: {response.status_code}")
+        logger.debug("Requesting embedding from %s with model: %s", url, model)
+        result = _ollama_post(url, payload, timeout=30)
 
         if not isinstance(result, dict):
             raise ValueError(f"Expected dict response, got {type(result)}")
@@ -72,54 +144,141 @@ def get_text_embedding(text: str) -> List[float]:
         if not all(isinstance(x, (int, float)) for x in embedding):
             raise ValueError("Embedding contains non-numeric values")
 
-        print(f"Successfully got embedding of size {len(embedding)} for model {model}")
+        logger.debug("Successfully got embedding of size %s for model %s", len(embedding), model)
         return embedding
 
-    except requests.exceptions.Timeout:
-        print(f"Timeout connecting to Ollama API at {url}")
-        raise ValueError(f"Timeout connecting to Ollama API (model: {model})")
+    except ValueError:
+        raise
 
-    except requests.exceptions.ConnectionError:
-        print(f"Connection error to Ollama API at {url}")
-        raise ValueError(f"Cannot connect to Ollama API at {OLLAMA_URL} (model: {model})")
+    except Exception as e:
+        logger.error("Unexpected error getting embedding: %s", e)
+        raise ValueError(f"Unexpected error getting embedding from model {model}: {str(e)}")
 
-    except requests.exceptions.RequestException as e:
-        print(f"Request error connecting to Ollama API: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                error_detail = e.response.json()
-                raise ValueError(f"Ollama API error: {error_detail}")
-            except:
-                raise ValueError(f"Ollama API error: {e.response.text}")
-        raise ValueError(f"Error connecting to Ollama API: {str(e)}")
+
+def get_text_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Embed several texts in one request using Ollama's batch /api/embed endpoint.
+    Texts embedded before with the same model are served from the embedding cache.
+
+    Args:
+        texts: Texts to embed
+
+    Returns:
+        One embedding vector per input text, in the same order
+
+    Raises:
+        ValueError: If the request fails or the response does not match the input
+    """
+    if not texts:
+        return []
+
+    model = DEFAULT_EMBEDDING_MODEL
+    keys = [compute_embedding_key(model, text) for text in texts]
+    cached = embedding_cache.get_many(keys)
+
+    missing = [index for index, embedding in enumerate(cached) if embedding is None]
+    if not missing:
+        return cached
+
+    missing_texts = [texts[index] for index in missing]
+    payload = {
+        "model": model,
+        "input": missing_texts
+    }
+
+    try:
+        logger.debug("Requesting %d embeddings (%d cached) from %s with model: %s",
+                     len(missing_texts), len(texts) - len(missing_texts), OLLAMA_EMBED_URL, model)
+        result = _ollama_post(OLLAMA_EMBED_URL, payload, timeout=EMBED_BATCH_TIMEOUT)
+
+        if not isinstance(result, dict):
+            raise ValueError(f"Expected dict response, got {type(result)}")
+
+        embeddings = result.get("embeddings")
+        if not isinstance(embeddings, list):
+            raise ValueError(f"No embeddings field in response. Response keys: {list(result.keys())}")
+
+        if len(embeddings) != len(missing_texts):
+            raise ValueError(f"Expected {len(missing_texts)} embeddings, got {len(embeddings)}")
+
+        for index, embedding in zip(missing, embeddings):
+            if not isinstance(embedding, list) or len(embedding) == 0:
+                raise ValueError("Received empty or invalid embedding")
+            cached[index] = embedding
+            embedding_cache.store(keys[index], embedding)
+
+        return cached
 
     except ValueError:
         raise
 
     except Exception as e:
-        print(f"Unexpected error getting embedding: {e}")
-        raise ValueError(f"Unexpected error getting embedding from model {model}: {str(e)}")
+        logger.error("Unexpected error getting batch embeddings: %s", e)
+        raise ValueError(f"Unexpected error getting embeddings from model {model}: {str(e)}")
 
 
-def get_ollama_image_description(image_path: str, prompt: str = None) -> str:
+def resize_image_for_vision(image_data: bytes) -> bytes:
     """
-    Get image description using the configured vision model. Only Called when local vision models are configured.
+    Decode an image once, downscale it to the vision model limits and re-encode it as JPEG
 
     Args:
-        image_path: Path to the image file
-        prompt: Custom prompt for image description (optional)
+        image_data: Raw image bytes in any format Pillow can read
 
     Returns:
-        String description of the image
+        JPEG bytes no larger than MAX_IMAGE_WIDTH x MAX_IMAGE_HEIGHT
+    """
+    with Image.open(io.BytesIO(image_data)) as img:
+        # Opening only parses the header; an RGB JPEG that already fits is sent as is
+        if (img.format == 'JPEG' and img.mode == 'RGB' and
+                img.width <= MAX_IMAGE_WIDTH and img.height <= MAX_IMAGE_HEIGHT):
+            return image_data
+
+        if img.format == 'JPEG':
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+            img.draft('RGB', (MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT))
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        scale = min(MAX_IMAGE_WIDTH / img.width, MAX_IMAGE_HEIGHT / img.height)
+        if scale < 1:
+            if cv2 is not None:
+                size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+                img = Image.fromarray(cv2.resize(np.asarray(img), size, interpolation=cv2.INTER_AREA))
+            else:
+                img.thumbnail((MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT), Image.LANCZOS)
 
-    Raises:
-        ValueError: If image processing fails
-        FileNotFoundError: If image file doesn't exist
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=JPEG_QUALITY)
+        return buffer.getvalue()
+
+
+def _prepare_for_vision(image_data: bytes) -> str:
     """
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image file not found: {image_path}")
+    Build the base64 payload sent to the vision model. Falls back to the original bytes
+    for formats Pillow cannot decode (e.g. EMF/WMF from Office documents).
+    """
+    try:
+        image_data = resize_image_for_vision(image_data)
+    except OSError as e:
+        logger.warning("Could not resize image for vision model, sending original: %s", e)
+
+    return base64.b64encode(image_data).decode('utf-8')
 
-    url = f"{OLLAMA_URL}{OLLAMA_GENERATE_ENDPOINT}"
+
+def _describe_with_ollama(image_data: bytes, prompt: str = None) -> str:
+    """
+    Describe raw image bytes with the configured Ollama vision model, using the image cache
+
+    Raises:
+        ValueError: If the vision request fails or returns an empty description
+    """
+    url = OLLAMA_GENERATE_URL
     model = DEFAULT_VISION_MODEL
 
     if prompt is None:
@@ -127,17 +286,15 @@ def get_ollama_image_description(image_path: str, prompt: str = None) -> str:
                     The Focus in on the text however. You are a image description agent. The descriptions are used
                     as context."""
 
-    try:
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-
-            cached_description = image_cache.get_description(image_data)
-            if cached_description:
-                return cached_description
+    image_hash = compute_image_hash(image_data)
+    cached_description = image_cache.get_description_by_hash(image_hash)
+    if cached_description:
+        return cached_description
 
-            image_b64 = base64.b64encode(image_data).decode('utf-8')
+    try:
+        image_b64 = _prepare_for_vision(image_data)
     except Exception as e:
-        raise ValueError(f"Failed to read image file {image_path}: {str(e)}")
+        raise ValueError(f"Failed to prepare image for vision model: {str(e)}")
 
     payload = {
         "model": model,
@@ -147,48 +304,56 @@ def get_ollama_image_description(image_path: str, prompt: str = None) -> str:
     }
 
     try:
-        print(f"Requesting image description from {url} with model: {model}")
-        response = requests.post(url, json=payload, timeout=IMAGE_TIMEOUT)
-        response.raise_for_status()
-
-        result = response.json()
+        logger.debug("Requesting image description from %s with model: %s", url, model)
+        result = _ollama_post(url, payload, timeout=IMAGE_TIMEOUT)
         description = result.get("response", "").strip()
-        image_cache.store_description(image_data, description)
 
         if not description:
             raise ValueError("Empty response from vision model")
 
-        print(f"Successfully got image description of length {len(description)}")
+        image_cache.store_description_by_hash(image_hash, description)
+        logger.debug("Successfully got image description of length %s", len(description))
         return description
 
-    except requests.exceptions.Timeout:
-        print(f"Timeout connecting to Ollama API at {url}")
-        raise ValueError(f"Timeout connecting to Ollama API (model: {model})")
+    except ValueError:
+        raise
 
-    except requests.exceptions.ConnectionError:
-        print(f"Connection error to Ollama API at {url}")
-        raise ValueError(f"Cannot connect to Ollama API at {OLLAMA_URL} (model: {model})")
+    except Exception as e:
+        logger.error("Unexpected error getting image description: %s", e)
+        raise ValueError(f"Unexpected error getting image description from model {model}: {str(e)}")
 
-    except requests.exceptions.RequestException as e:
-        print(f"Request error connecting to Ollama API: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                error_detail = e.response.json()
-                raise ValueError(f"Ollama API error: {error_detail}")
-            except:
-                raise ValueError(f"Ollama API error: {e.response.text}")
-        raise ValueError(f"Error connecting to Ollama API: {str(e)}")
 
+def get_ollama_image_description(image_path: str, prompt: str = None) -> str:
+    """
+    Get image description using the configured vision model. Only Called when local vision models are configured.
+
+    Args:
+        image_path: Path to the image file
+        prompt: Custom prompt for image description (optional)
+
+    Returns:
+        String description of the image
+
+    Raises:
+        ValueError: If image processing fails
+        FileNotFoundError: If image file doesn't exist
+    """
+    try:
+        with open(image_path, "rb") as image_file:
+            image_data = image_file.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Image file not found: {image_path}")
     except Exception as e:
-        print(f"Unexpected error getting image description: {e}")
-        raise ValueError(f"Unexpected error getting image description from model {model}: {str(e)}")
+        raise ValueError(f"Failed to read image file {image_path}: {str(e)}")
+
+    return _describe_with_ollama(image_data, prompt)
 
 
 def get_available_models() -> Dict[str, List[str]]:
     """Get all available models from Ollama and categorize them"""
     try:
-        url = f"{OLLAMA_URL}{OLLAMA_TAGS_ENDPOINT}"
-        response = requests.get(url, timeout=10)
+        url = OLLAMA_TAGS_URL
+        response = _ollama_session.get(url, timeout=10)
         response.raise_for_status()
 
         data = response.json()
@@ -215,7 +380,7 @@ def get_available_models() -> Dict[str, List[str]]:
         }
 
     except Exception as e:
-        print(f"Error getting available models: {e}")
+        logger.warning("Error getting available models: %s", e)
         return {
             "embedding": [],
             "vision": [],
@@ -235,44 +400,37 @@ def get_ollama_image_description_from_bytes(image_data: bytes) -> str:
         String description of the image
     """
     try:
-        if image_data.startswith(b'\xff\xd8\xff'):
-            suffix = '.jpg'
-        elif image_data.startswith(b'\x89PNG\r\n\x1a\n'):
-            suffix = '.png'
-        elif image_data.startswith(b'GIF87a') or image_data.startswith(b'GIF89a'):
-            suffix = '.gif'
-        elif image_data.startswith(b'RIFF') and b'WEBP' in image_data[:12]:
-            suffix = '.webp'
-        else:
-            suffix = '.png'
+        description = _describe_with_ollama(image_data)
 
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
-            temp_file.write(image_data)
-            temp_file_path = temp_file.name
+        if not description or description.strip() == "":
+            return "No description available for this image."
+        return description.strip()
 
-        try:
-            description = get_ollama_image_description(temp_file_path)
+    except Exception as e:
+        logger.warning("Error getting image description from bytes: %s", e)
+        error_description = "Failed to describe this image."
+        return error_description
 
-            if not description or description.strip() == "":
-                description = "No description available for this image."
-            else:
-                description = description.strip()
 
-            print(
-                f"Generated and cached new image description (hash: {hashlib.sha256(image_data).hexdigest()[:12]}...)")
+def _describe_unique_image(img_data: bytes, seen_hashes: Set[str]) -> Optional[str]:
+    """
+    Describe an image unless an identical one was already described for the same document
 
-            return description
+    Args:
+        img_data: Raw image bytes
+        seen_hashes: Hashes of images already described for the current document (updated in place)
 
-        finally:
-            try:
-                os.unlink(temp_file_path)
-            except OSError:
-                pass
+    Returns:
+        The image description, or None if the image is a duplicate
+    """
+    img_hash = compute_image_hash(img_data)
+    if img_hash in seen_hashes:
+        return None
+    seen_hashes.add(img_hash)
 
-    except Exception as e:
-        print(f"Error getting image description from bytes: {e}")
-        error_description = "Failed to describe this image."
-        return error_description
+    if USE_GOOGLE_VISION:
+        return get_gemini_description(img_data)
+    return get_ollama_image_description_from_bytes(img_data)
 
 
 def extract_images_from_xlsx(file_path: str) -> List[Tuple[bytes, str]]:
@@ -290,69 +448,79 @@ def extract_images_from_xlsx(file_path: str) -> List[Tuple[bytes, str]]:
         with zipfile.ZipFile(file_path, 'r') as zip_file:
             # Look for image files in the media directory
             for file_info in zip_file.filelist:
-                if file_info.filename.startswith('xl/media/'):
-                    # Check if it's an image file
-                    if any(file_info.filename.lower().endswith(ext) for ext in
-                           ['.png', '.jpg', '.jpeg', '.gif', '.bmp']):
-                        try:
-                            img_data = zip_file.read(file_info.filename)
-
-                            img_hash = compute_image_hash(img_data)
-                            if img_hash in seen_hashes:
-                                print(f"Skipping duplicate Excel image: {file_info.filename}")
-                                continue
-                            seen_hashes.add(img_hash)
+                name = file_info.filename
+                if not name.startswith('xl/media/'):
+                    continue
+                # Check if it's an image file
+                if not name.lower().endswith(ZIP_IMAGE_EXTENSIONS):
+                    continue
 
-                            if USE_GOOGLE_VISION:
-                                description = get_gemini_description(img_data)
-                            else:
-                                description = get_ollama_image_description_from_bytes(img_data)
-                            images.append((img_data, f"[Excel embedded image]: {description}"))
+                try:
+                    with zip_file.open(file_info) as image_file:
+                        img_data = image_file.read()
 
-                        except Exception as e:
-                            print(f"Error processing Excel image {file_info.filename}: {e}")
-                            continue
+                    description = _describe_unique_image(img_data, seen_hashes)
+                    if description is None:
+                        logger.debug("Skipping duplicate Excel image: %s", name)
+                        continue
+                    images.append((img_data, f"[Excel embedded image]: {description}"))
+
+                except Exception as e:
+                    logger.warning("Error processing Excel image %s: %s", name, e)
+                    continue
 
     except Exception as e:
-        print(f"Error extracting images from Excel {file_path}: {e}")
+        logger.error("Error extracting images from Excel %s: %s", file_path, e)
 
     return images
 
 
-def detect_file_type(file_path: str) -> str:
-    """
-    Detect file type based on extension and MIME type
-    Now supports PDF, PowerPoint, Excel, and text files
-    """
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower()
+DETECT_FILE_TYPE_CACHE_SIZE = 4096
+FILE_TYPE_HEADER_SIZE = 4096
+
+_EXTENSION_FILE_TYPES = {
+    '.pdf': 'pdf',
+    '.pptx': 'pptx',
+    '.xlsx': 'xlsx',
+    '.docx': 'docx',
+    **dict.fromkeys(['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'], 'image'),
+    **dict.fromkeys(['.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv'], 'text'),
+}
+
+_MIME_FILE_TYPES = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'pptx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+}
+
+_guess_mime_type = lru_cache(maxsize=DETECT_FILE_TYPE_CACHE_SIZE)(mimetypes.guess_type)
 
-    if ext == '.pdf':
-        return 'pdf'
-    elif ext == '.pptx':
-        return 'pptx'
-    elif ext == '.xlsx':
-        return 'xlsx'
-    elif ext == '.docx':
-        return 'docx'
-    if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']:
-        return 'image'
-    elif ext in ['.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv']:
-        return 'text'
 
-    mime_type, _ = mimetypes.guess_type(file_path)
+def _file_type_from_name(file_name: str) -> Optional[str]:
+    """Detect file type from the extension, then the guessed MIME type; None if neither is known"""
+    _, ext = os.path.splitext(file_name)
+
+    file_type = _EXTENSION_FILE_TYPES.get(ext.lower())
+    if file_type:
+        return file_type
+
+    mime_type, _ = _guess_mime_type(file_name)
     if mime_type:
-        if mime_type == 'application/pdf':
-            return 'pdf'
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.presentationml.presentation':
-            return 'pptx'
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet':
-            return 'xlsx'
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-            return 'docx'
+        if mime_type in _MIME_FILE_TYPES:
+            return _MIME_FILE_TYPES[mime_type]
         elif mime_type.startswith('text/'):
             return 'text'
 
+    return None
+
+
+@lru_cache(maxsize=DETECT_FILE_TYPE_CACHE_SIZE)
+def _sniff_file_type(file_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Detect the type of a file without a known extension or MIME type by its content.
+    Keyed by mtime and size as well, so a rewritten file is sniffed again.
+    """
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             f.read(1024)
@@ -368,76 +536,214 @@ def detect_file_type(file_path: str) -> str:
     return 'unknown'
 
 
+def detect_file_type(file_path: str) -> str:
+    """
+    Detect file type based on extension and MIME type
+    Now supports PDF, PowerPoint, Excel, and text files
+    """
+    file_type = _file_type_from_name(file_path)
+    if file_type:
+        return file_type
+
+    stat = os.stat(file_path)
+    return _sniff_file_type(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+def detect_file_type_from_header(file_name: str, header: bytes) -> str:
+    """
+    Detect file type from a file name and the first bytes of its content,
+    e.g. for an upload that has not been written to disk yet
+
+    Args:
+        file_name: Original file name
+        header: Leading bytes of the file, FILE_TYPE_HEADER_SIZE is enough
+
+    Returns:
+        Same file type names as detect_file_type, 'unknown' if unsupported
+    """
+    file_type = _file_type_from_name(file_name)
+    if file_type:
+        return file_type
+
+    if header.startswith(b"%PDF-"):
+        return 'pdf'
+
+    try:
+        header.decode("utf-8")
+        return 'text'
+    except UnicodeDecodeError as e:
+        # Only the last character was cut off by the header boundary
+        if e.reason == 'unexpected end of data':
+            return 'text'
+
+    return 'unknown'
+
+
+def _extract_pdf_page_text_fallback(file_path: str, page_num: int) -> str:
+    """Extract one page's text with PyPDF2, used when PyMuPDF fails on a page"""
+    with open(file_path, "rb") as f:
+        return PyPDF2.PdfReader(f).pages[page_num].extract_text() or ""
+
+
+def _extract_pdf_page_range(file_path: str, start: int, end: int) -> List[Optional[str]]:
+    """
+    Extract the text of pages [start, end) in a worker process
+
+    Returns:
+        One entry per page, None where PyMuPDF failed on that page
+    """
+    texts = []
+    with fitz.open(file_path) as doc:
+        for page_num in range(start, end):
+            try:
+                texts.append(doc.load_page(page_num).get_text())
+            except Exception:
+                texts.append(None)
+    return texts
+
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    """Return the shared PDF worker pool, starting it if needed"""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor(
+                max_workers=PDF_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_executor
+
+
+def _discard_pdf_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Tear down a pool that timed out or broke; the next PDF starts a fresh one
+
+    Pending work is cancelled and the workers are terminated, so a page stuck in PyMuPDF
+    does not keep its process alive next to the replacement pool.
+    """
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is executor:
+            _pdf_executor = None
+    # shutdown() drops the executor's process table, so take it first
+    workers = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for worker in workers:
+        if worker.is_alive():
+            worker.terminate()
+
+
+def _extract_pdf_texts_parallel(file_path: str, page_count: int) -> List[Optional[str]]:
+    """
+    Split the page range across the PDF worker processes and extract all page texts
+
+    Raises:
+        TimeoutError: If the workers do not finish within PDF_PARALLEL_TIMEOUT seconds
+    """
+    pages_per_worker = -(-page_count // PDF_MAX_WORKERS)
+    ranges = [
+        (start, min(start + pages_per_worker, page_count))
+        for start in range(0, page_count, pages_per_worker)
+    ]
+
+    executor = _get_pdf_executor()
+    try:
+        results = executor.map(
+            _extract_pdf_page_range,
+            [file_path] * len(ranges),
+            [start for start, _ in ranges],
+            [end for _, end in ranges],
+            timeout=PDF_PARALLEL_TIMEOUT
+        )
+        return [text for texts in results for text in texts]
+    except (TimeoutError, BrokenProcessPool):
+        _discard_pdf_executor(executor)
+        raise
+
+
 def extract_pdf(file_path: str, include_images: bool = True) -> str:
     """Extract text from PDF files, optionally including image descriptions in proper order"""
     try:
         text_content = []
         seen_hashes: Set[str] = set()
 
-        # Use PyPDF2 for text and PyMuPDF for images (if needed)
-        with open(file_path, "rb") as f:
-            pdf_reader = PyPDF2.PdfReader(f)
+        # PyMuPDF handles both text and images; PyPDF2 is only a per-page fallback for text
+        with fitz.open(file_path) as fitz_doc:
+            page_count = fitz_doc.page_count
 
-            # Also open with PyMuPDF for image extraction if needed
-            fitz_doc = None
-            if include_images:
-                fitz_doc = fitz.open(file_path)
+            # Large documents get their text extracted in worker processes up front
+            page_texts: List[Optional[str]] = [None] * page_count
+            if page_count >= PDF_PARALLEL_MIN_PAGES and PDF_MAX_WORKERS > 1:
+                try:
+                    page_texts = _extract_pdf_texts_parallel(file_path, page_count)
+                except TimeoutError:
+                    logger.warning("Parallel PDF text extraction timed out after %ss, continuing sequentially",
+                                   PDF_PARALLEL_TIMEOUT)
+                except Exception as e:
+                    logger.warning("Parallel PDF text extraction failed, continuing sequentially: %s", e)
 
-            for page_num in range(len(pdf_reader.pages)):
+            for page_num in range(page_count):
                 page_content = []
 
                 # Add page header
                 page_content.append(f"=== PAGE {page_num + 1} ===")
 
+                fitz_page = fitz_doc.load_page(page_num)
+
                 # Extract and add images first (they're usually at the top/integrated in content)
-                if include_images and fitz_doc:
+                if include_images:
                     try:
-                        fitz_page = fitz_doc.load_page(page_num)
                         image_list = fitz_page.get_images()
 
                         for img_index, img in enumerate(image_list):
                             try:
                                 xref = img[0]
-                                pix = fitz.Pixmap(fitz_doc, xref)
 
-                                # Convert to PNG bytes
-                                if pix.n - pix.alpha < 4:
-                                    img_data = pix.tobytes("png")
+                                # JPEG and PNG streams are used as stored, without decoding to a pixmap
+                                embedded = fitz_doc.extract_image(xref)
+                                if embedded and embedded.get("ext") in ("jpeg", "png"):
+                                    img_data = embedded["image"]
                                 else:
-                                    pix1 = fitz.Pixmap(fitz.csRGB, pix)
-                                    img_data = pix1.tobytes("png")
-                                    pix1 = None
+                                    pix = fitz.Pixmap(fitz_doc, xref)
 
-                                # Check for duplicates
-                                img_hash = compute_image_hash(img_data)
-                                if img_hash not in seen_hashes:
-                                    seen_hashes.add(img_hash)
-
-                                    if USE_GOOGLE_VISION:
-                                        description = get_gemini_description(img_data)
+                                    # Convert to PNG bytes
+                                    if pix.n - pix.alpha < 4:
+                                        img_data = pix.tobytes("png")
                                     else:
-                                        description = get_ollama_image_description_from_bytes(img_data)
+                                        pix1 = fitz.Pixmap(fitz.csRGB, pix)
+                                        img_data = pix1.tobytes("png")
+                                        pix1 = None
+                                    pix = None
 
+                                description = _describe_unique_image(img_data, seen_hashes)
+                                if description is not None:
                                     page_content.append(f"[IMAGE]: {description}")
                                 else:
-                                    print(f"Skipping duplicate PDF image on page {page_num + 1}")
-
-                                pix = None
+                                    logger.debug("Skipping duplicate PDF image on page %s", page_num + 1)
 
                             except Exception as e:
-                                print(f"Error extracting image {img_index} from page {page_num + 1}: {e}")
+                                logger.warning("Error extracting image %s from page %s: %s",
+                                               img_index, page_num + 1, e)
                                 continue
 
                     except Exception as e:
-                        print(f"Error processing images on page {page_num + 1}: {e}")
+                        logger.warning("Error processing images on page %s: %s", page_num + 1, e)
 
                 try:
-                    page = pdf_reader.pages[page_num]
-                    page_text = page.extract_text().strip()
+                    try:
+                        page_text = page_texts[page_num]
+                        if page_text is None:
+                            page_text = fitz_page.get_text()
+                    except Exception as e:
+                        logger.debug("PyMuPDF text extraction failed on page %s, using PyPDF2: %s",
+                                     page_num + 1, e)
+                        page_text = _extract_pdf_page_text_fallback(file_path, page_num)
+
+                    page_text = page_text.strip()
                     if page_text:
                         page_content.append(page_text)
                 except Exception as e:
-                    print(f"Error extracting text from page {page_num + 1}: {e}")
+                    logger.warning("Error extracting text from page %s: %s", page_num + 1, e)
                     page_content.append("(Error extracting text from this page)")
 
                 # Add page content to main text
@@ -450,15 +756,11 @@ def extract_pdf(file_path: str, include_images: bool = True) -> str:
                     text_content.append("(Empty page)")
                     text_content.append("")
 
-            # Close PyMuPDF document if opened
-            if fitz_doc:
-                fitz_doc.close()
-
         result = "\n".join(text_content)
         return result if result.strip() else "No content found in PDF."
 
     except Exception as e:
-        print(f"Error extracting content from PDF {file_path}: {e}")
+        logger.error("Error extracting content from PDF %s: %s", file_path, e)
         raise ValueError(f"Failed to extract content from PDF file: {str(e)}")
 
 
@@ -488,23 +790,23 @@ def _create_image_relationship_map(file_path: str) -> Dict[str, bytes]:
                         image_path = f"word/{target}"
 
                         # Check if it's a supported image format
-                        if any(image_path.lower().endswith(ext) for ext in
-                               ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff']):
+                        if image_path.lower().endswith(ZIP_IMAGE_EXTENSIONS):
                             try:
-                                img_data = zip_file.read(image_path)
+                                with zip_file.open(image_path) as image_file:
+                                    img_data = image_file.read()
                                 image_map[rel_id] = img_data
                             except KeyError:
-                                print(f"Image file not found: {image_path}")
+                                logger.warning("Image file not found: %s", image_path)
                             except Exception as e:
-                                print(f"Error reading image {image_path}: {e}")
+                                logger.warning("Error reading image %s: %s", image_path, e)
 
             except KeyError:
-                print("No relationships file found")
+                logger.debug("No relationships file found")
             except Exception as e:
-                print(f"Error parsing relationships: {e}")
+                logger.warning("Error parsing relationships: %s", e)
 
     except Exception as e:
-        print(f"Error creating image relationship map: {e}")
+        logger.warning("Error creating image relationship map: %s", e)
 
     return image_map
 
@@ -535,20 +837,13 @@ def extract_docx(file_path: str, include_images: bool = True) -> str:
                             if embed_id and embed_id in image_map:
                                 img_data = image_map[embed_id]
                                 try:
-                                    img_hash = compute_image_hash(img_data)
-                                    if img_hash not in seen_hashes:
-                                        seen_hashes.add(img_hash)
-
-                                        if USE_GOOGLE_VISION:
-                                            description = get_gemini_description(img_data)
-                                        else:
-                                            description = get_ollama_image_description_from_bytes(img_data)
-
+                                    description = _describe_unique_image(img_data, seen_hashes)
+                                    if description is not None:
                                         text_content.append(f"[IMAGE]: {description}")
                                     else:
-                                        print(f"Skipping duplicate image in paragraph")
+                                        logger.debug("Skipping duplicate image in paragraph")
                                 except Exception as e:
-                                    print(f"Error processing inline image: {e}")
+                                    logger.warning("Error processing inline image: %s", e)
 
             # Add paragraph text if it exists
             if paragraph.text.strip():
@@ -571,20 +866,13 @@ def extract_docx(file_path: str, include_images: bool = True) -> str:
                                         if embed_id and embed_id in image_map:
                                             img_data = image_map[embed_id]
                                             try:
-                                                img_hash = compute_image_hash(img_data)
-                                                if img_hash not in seen_hashes:
-                                                    seen_hashes.add(img_hash)
-
-                                                    if USE_GOOGLE_VISION:
-                                                        description = get_gemini_description(img_data)
-                                                    else:
-                                                        description = get_ollama_image_description_from_bytes(img_data)
-
+                                                description = _describe_unique_image(img_data, seen_hashes)
+                                                if description is not None:
                                                     row_data.append(f"[IMAGE]: {description}")
                                                 else:
-                                                    print(f"Skipping duplicate image in table cell")
+                                                    logger.debug("Skipping duplicate image in table cell")
                                             except Exception as e:
-                                                print(f"Error processing table image: {e}")
+                                                logger.warning("Error processing table image: %s", e)
 
                     # Add cell text
                     if cell.text.strip():
@@ -605,7 +893,7 @@ def extract_docx(file_path: str, include_images: bool = True) -> str:
         return result
 
     except Exception as e:
-        print(f"Error extracting text from Word document {file_path}: {e}")
+        logger.error("Error extracting text from Word document %s: %s", file_path, e)
         raise ValueError(f"Failed to extract text from Word document: {str(e)}")
 
 
@@ -665,14 +953,14 @@ def extract_xlsx(file_path: str, include_images: bool = True) -> str:
 
         workbook.close()
 
-        result = "\n".join(text_content)
-
         if include_images:
             images = extract_images_from_xlsx(file_path)
             if images:
-                result += "\n\n=== EMBEDDED IMAGES ===\n\n"
+                text_content.append("\n=== EMBEDDED IMAGES ===\n")
                 for i, (img_data, description) in enumerate(images, 1):
-                    result += f"Image {i}: {description}\n\n"
+                    text_content.append(f"Image {i}: {description}\n")
+
+        result = "\n".join(text_content)
 
         if not result.strip():
             return "No data found in Excel file."
@@ -680,7 +968,7 @@ def extract_xlsx(file_path: str, include_images: bool = True) -> str:
         return result
 
     except Exception as e:
-        print(f"Error extracting text from Excel {file_path}: {e}")
+        logger.error("Error extracting text from Excel %s: %s", file_path, e)
         raise ValueError(f"Failed to extract text from Excel file: {str(e)}")
 
 
@@ -697,35 +985,33 @@ def extract_pptx(file_path: str, include_images: bool = True) -> str:
             slide_text = [f"=== SLIDE {slide_num} ==="]
 
             for shape in slide.shapes:
-                if include_images and hasattr(shape, "image") and shape.image:
+                if include_images:
                     try:
-                        img_data = shape.image.blob
-                        img_hash = compute_image_hash(img_data)
-
-                        if img_hash not in seen_hashes:
-                            seen_hashes.add(img_hash)
-
-                            if USE_GOOGLE_VISION:
-                                description = get_gemini_description(img_data)
+                        image = getattr(shape, "image", None)
+                        if image:
+                            description = _describe_unique_image(image.blob, seen_hashes)
+                            if description is not None:
+                                slide_text.append(f"[IMAGE]: {description}")
                             else:
-                                description = get_ollama_image_description_from_bytes(img_data)
-
-                            slide_text.append(f"[IMAGE]: {description}")
-                        else:
-                            print(f"Skipping duplicate image on slide {slide_num}")
+                                logger.debug("Skipping duplicate image on slide %s", slide_num)
                     except Exception as e:
-                        print(f"Error extracting image from slide {slide_num}: {e}")
+                        logger.warning("Error extracting image from slide %s: %s", slide_num, e)
 
-                if hasattr(shape, "text") and shape.text.strip():
-                    slide_text.append(shape.text.strip())
+                # Each .text access re-walks the shape XML, so read it once
+                text = getattr(shape, "text", None)
+                if text:
+                    text = text.strip()
+                    if text:
+                        slide_text.append(text)
 
-                if shape.has_table:
+                if getattr(shape, "has_table", False):
                     table_text = []
                     for row in shape.table.rows:
                         row_text = []
                         for cell in row.cells:
-                            if cell.text.strip():
-                                row_text.append(cell.text.strip())
+                            cell_text = cell.text.strip()
+                            if cell_text:
+                                row_text.append(cell_text)
                         if row_text:
                             table_text.append(" | ".join(row_text))
 
@@ -745,22 +1031,25 @@ def extract_pptx(file_path: str, include_images: bool = True) -> str:
         return result
 
     except Exception as e:
-        print(f"Error extracting text from PowerPoint {file_path}: {e}")
+        logger.error("Error extracting text from PowerPoint %s: %s", file_path, e)
         raise ValueError(f"Failed to extract text from PowerPoint file: {str(e)}")
 
 
-def read_file_content(file_path: str, include_images: bool = True) -> Tuple[str, str]:
+def read_file_content(file_path: str, include_images: bool = True,
+                      file_type: Optional[str] = None) -> Tuple[str, str]:
     """
     Read and extract content from supported file types, optionally including image descriptions
 
     Args:
         file_path: Path to the file
         include_images: Whether to extract and describe embedded images
+        file_type: Already detected file type; detected from the file if not given
 
     Returns:
         (content, file_type)
     """
-    file_type = detect_file_type(file_path)
+    if file_type is None:
+        file_type = detect_file_type(file_path)
 
     if file_type == 'text':
         with open(file_path, "r", encoding="utf-8") as f:
@@ -791,3 +1080,4 @@ def read_file_content(file_path: str, include_images: bool = True) -> Tuple[str,
 
 
 image_cache = ImageDescriptionCache(max_size=1000)
+embedding_cache = EmbeddingCache(max_size=EMBED_CACHE_SIZE)
@@ -0,0 +1,66 @@
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_SIZE = 32
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def create_session(pool_size: int = HTTP_POOL_SIZE, retries: int = 3) -> requests.Session:
+    """
+    Create a requests session with a keep-alive connection pool and connect retries
+
+    Args:
+        pool_size: Maximum number of pooled connections per host
+        retries: How often failed connection attempts are retried; requests that already
+            reached the server are never replayed
+
+    Returns:
+        Configured requests session, meant to be shared at module level
+    """
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, read=0, backoff_factor=0.2)
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide async HTTP client, creating it on first use
+
+    Async route handlers use it so their outbound calls do not block the event loop;
+    keep-alive connections are shared across all requests. Redirects are followed like
+    requests does.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE
+            ),
+            follow_redirects=True
+        )
+        # The client is shared by all users, so cookies a response sets (e.g. Langflow's
+        # auth cookies) must not be stored and replayed for someone else
+        _async_client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the shared async HTTP client and its pooled connections"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -1,8 +1,11 @@
 import hashlib
+import logging
 import threading
 from typing import Dict, Optional
 from collections import OrderedDict
 
+logger = logging.getLogger(__name__)
+
 
 def compute_image_hash(image_data: bytes) -> str:
     """Compute SHA-256 hash of image data"""
@@ -19,11 +22,14 @@ class ImageDescriptionCache:
 
     def get_description(self, image_data: bytes) -> Optional[str]:
         """Get cached description for image data and move to end (most recent)"""
-        image_hash = compute_image_hash(image_data)
+        return self.get_description_by_hash(compute_image_hash(image_data))
+
+    def get_description_by_hash(self, image_hash: str) -> Optional[str]:
+        """Get cached description for an already computed image hash"""
         with self._lock:
-            if image_hash in self._cache:
-                description = self._cache.pop(image_hash)
-                self._cache[image_hash] = description
+            description = self._cache.get(image_hash)
+            if description is not None:
+                self._cache.move_to_end(image_hash)
                 self._hits += 1
                 return description
             else:
@@ -32,19 +38,25 @@ class ImageDescriptionCache:
 
     def store_description(self, image_data: bytes, description: str) -> None:
         """Store description for image data"""
-        image_hash = compute_image_hash(image_data)
+        self.store_description_by_hash(compute_image_hash(image_data), description)
+
+    def store_description_by_hash(self, image_hash: str, description: str) -> None:
+        """Store description for an already computed image hash"""
+        evicted_key = None
         with self._lock:
             if image_hash in self._cache:
-                self._cache.pop(image_hash)
                 self._cache[image_hash] = description
+                self._cache.move_to_end(image_hash)
             else:
                 # Add new item
                 if len(self._cache) >= self.max_size:
-                    oldest_key, _ = self._cache.popitem(last=False)
-                    print(f"Evicted LRU image from cache: {oldest_key[:12]}...")
+                    evicted_key, _ = self._cache.popitem(last=False)
 
                 self._cache[image_hash] = description
 
+        if evicted_key:
+            logger.debug("Evicted LRU image from cache: %s...", evicted_key[:12])
+
     def clear(self) -> None:
         """Clear all cached descriptions"""
         with self._lock:
@@ -55,11 +67,15 @@ class ImageDescriptionCache:
     def get_cache_stats(self) -> Dict[str, any]:
         """Get cache statistics"""
         with self._lock:
-            hit_rate = self._hits / (self._hits + self._misses) if (self._hits + self._misses) > 0 else 0
-            return {
-                "size": len(self._cache),
-                "max_size": self.max_size,
-                "hits": self._hits,
-                "misses": self._misses,
-                "hit_rate": round(hit_rate * 100, 2)
-            }
+            size = len(self._cache)
+            hits = self._hits
+            misses = self._misses
+
+        hit_rate = hits / (hits + misses) if (hits + misses) > 0 else 0
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hit_rate * 100, 2)
+        }
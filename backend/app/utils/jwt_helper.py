@@ -1,93 +1,196 @@
 from fastapi import Request
-import jwt
+import base64
+import json
 import time
 import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
 from typing import Optional, Tuple, Dict, Any
 from ..external.langflow_repository import LangflowRepository
 
+logger = logging.getLogger(__name__)
+
 _admin_token_cache: Dict[str, Any] = {"token": None, "expiry": 0}
+_admin_token_lock = asyncio.Lock()
 
 SUPERUSER_USERNAME = os.getenv("BACKEND_LF_USERNAME")
 SUPERUSER_PASSWORD = os.getenv("BACKEND_LF_PASSWORD")
 TOKEN_EXPIRY_BUFFER = 300
 
+DECODED_TOKEN_CACHE_SIZE = 1024
+DECODED_TOKEN_TTL = 300
+
+_decoded_token_cache: OrderedDict[str, Tuple[Dict[str, Any], float]] = OrderedDict()
+_decoded_token_lock = threading.Lock()
+
 
-def _is_valid_langflow_token(token: str, token_type: str) -> bool:
+def _decode_payload(token: str) -> Dict[str, Any]:
     """
-    Check if token is a valid Langflow JWT with specified type
+    Decode the payload segment of a JWT without verifying its signature
+
+    Raises:
+        ValueError: If the token is not a well-formed JWT with a JSON object payload
+    """
+    _, payload_b64, _ = token.split('.', 2)
+    padding = '=' * (-len(payload_b64) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(payload_b64 + padding))
+
+    if not isinstance(payload, dict):
+        raise ValueError("JWT payload is not a JSON object")
+    return payload
+
+
+def _has_jwt_header(header_b64: str) -> bool:
+    """
+    Cheap pre-check: decode only the (short) header segment and look for a JWT "alg" field
     """
     try:
-        decoded = jwt.decode(token, options={"verify_signature": False})
+        header = json.loads(base64.urlsafe_b64decode(header_b64 + '=' * (-len(header_b64) % 4)))
+    except ValueError:
+        return False
+    return isinstance(header, dict) and "alg" in header
 
-        has_sub = "sub" in decoded
-        has_type = decoded.get("type") == token_type
-        has_exp = "exp" in decoded
 
-        return has_sub and has_type and has_exp
+def _decode_cached(token: str, now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Decode a JWT payload without signature verification, memoizing the result per token.
+    Entries live until the token expires, but at most DECODED_TOKEN_TTL seconds.
+
+    Raises:
+        ValueError: If the token cannot be decoded (failures are not cached)
+    """
+    if now is None:
+        now = time.time()
+
+    with _decoded_token_lock:
+        entry = _decoded_token_cache.get(token)
+        if entry is not None:
+            decoded, valid_until = entry
+            if valid_until > now:
+                _decoded_token_cache.move_to_end(token)
+                return decoded
+            del _decoded_token_cache[token]
+
+    decoded = _decode_payload(token)
 
+    valid_until = now + DECODED_TOKEN_TTL
+    exp = decoded.get("exp")
+    if isinstance(exp, (int, float)):
+        valid_until = min(valid_until, exp)
+
+    with _decoded_token_lock:
+        _decoded_token_cache[token] = (decoded, valid_until)
+        _decoded_token_cache.move_to_end(token)
+        while len(_decoded_token_cache) > DECODED_TOKEN_CACHE_SIZE:
+            _decoded_token_cache.popitem(last=False)
+
+    return decoded
+
+
+def _classify_langflow_token(token: str) -> Optional[str]:
+    """
+    Decode a token once and return its Langflow type ("access" or "refresh"),
+    None if it is not a valid Langflow JWT
+    """
+    try:
+        decoded = _decode_cached(token)
     except Exception as e:
-        print(f"Error checking {token_type} JWT: {e}")
-        return False
+        logger.debug("Error checking Langflow JWT: %s", e)
+        return None
+
+    if "sub" not in decoded or "exp" not in decoded:
+        return None
 
+    token_type = decoded.get("type")
+    if token_type in ("access", "refresh"):
+        return token_type
+    return None
 
-def get_user_tokens(request: Request) -> Tuple[Optional[str], Optional[str]]:
+
+def get_user_tokens(
+    request: Request,
+    need_access: bool = True,
+    need_refresh: bool = True
+) -> Tuple[Optional[str], Optional[str]]:
     """
     Smart JWT extraction - finds both access and refresh Langflow tokens from cookies
     Returns: (access_token, refresh_token)
+
+    Args:
+        request: FastAPI request object
+        need_access: Look for the access token
+        need_refresh: Look for the refresh token (None is returned for it if False)
+
+    A full scan is cached on request.state, so repeated lookups within one request are free.
     """
-    access_token = None
-    refresh_token = None
+    cached_tokens = getattr(request.state, "_lf_tokens", None)
+    if cached_tokens is not None:
+        return cached_tokens
+
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
 
     try:
         all_cookies = request.cookies
-        print(f"Found {len(all_cookies)} cookies")
+        logger.debug("Found %d cookies", len(all_cookies))
 
         # Look through all cookies to find valid Langflow JWTs
         for cookie_name, cookie_value in all_cookies.items():
-            print(f"Checking cookie: {cookie_name}")
+            logger.debug("Checking cookie: %s", cookie_name)
 
             # Skip obviously non-JWT cookies
             if not cookie_value or len(cookie_value) < 50:
                 continue
 
             # Check if this looks like a JWT (has 3 parts separated by dots)
-            if cookie_value.count('.') != 2:
+            parts = cookie_value.split('.', 2)
+            if len(parts) != 3 or '.' in parts[2]:
+                continue
+
+            # Dotted opaque session cookies fail here without decoding their payload
+            if not _has_jwt_header(parts[0]):
                 continue
 
-            # Check for access token
-            if not access_token and _is_valid_langflow_token(cookie_value, "access"):
-                print(f"Found valid Langflow access JWT in cookie: {cookie_name}")
-                access_token = cookie_value
+            token_type = _classify_langflow_token(cookie_value)
 
-            # Check for refresh token
-            elif not refresh_token and _is_valid_langflow_token(cookie_value, "refresh"):
-                print(f"Found valid Langflow refresh JWT in cookie: {cookie_name}")
-                refresh_token = cookie_value
+            if token_type == "access":
+                if need_access and not access_token:
+                    logger.debug("Found valid Langflow access JWT in cookie: %s", cookie_name)
+                    access_token = cookie_value
 
-            # Stop searching if we found both tokens
-            if access_token and refresh_token:
+            elif token_type == "refresh":
+                if need_refresh and not refresh_token:
+                    logger.debug("Found valid Langflow refresh JWT in cookie: %s", cookie_name)
+                    refresh_token = cookie_value
+
+            # Stop searching once every requested token is found
+            if (not need_access or access_token) and (not need_refresh or refresh_token):
                 break
 
-        if not access_token:
-            print("No valid Langflow access JWT found in cookies")
-        if not refresh_token:
-            print("No valid Langflow refresh JWT found in cookies")
+        if need_access and not access_token:
+            logger.debug("No valid Langflow access JWT found in cookies")
+        if need_refresh and not refresh_token:
+            logger.debug("No valid Langflow refresh JWT found in cookies")
 
+        if need_access and need_refresh:
+            request.state._lf_tokens = (access_token, refresh_token)
         return access_token, refresh_token
 
     except Exception as e:
-        print(f"Error extracting user tokens: {e}")
+        logger.warning("Error extracting user tokens: %s", e)
         return None, None
 
 
-def get_token_max_age(token: str) -> int:
+def get_token_max_age(token: str, now: Optional[float] = None) -> int:
     """
     Calculate the remaining time in seconds until token expires
     """
     try:
-        token_info = jwt.decode(token, options={"verify_signature": False})
+        current_time = int(time.time() if now is None else now)
+        token_info = _decode_cached(token, current_time)
         token_expiry = token_info.get("exp", 0)
-        current_time = int(time.time())
         return max(0, token_expiry - current_time)
     except:
         return 0
@@ -98,10 +201,10 @@ def get_token_expiry(token: str) -> int:
     Get the expiry timestamp from a token
     """
     try:
-        decoded = jwt.decode(token, options={"verify_signature": False})
+        decoded = _decode_cached(token)
         return decoded.get("exp", 0)
     except Exception as e:
-        print(f"Error decoding token: {e}")
+        logger.warning("Error decoding token: %s", e)
         return 0
 
 
@@ -109,7 +212,7 @@ def get_user_token(request: Request) -> Optional[str]:
     """
     Legacy function for backward compatibility - returns only access token
     """
-    access_token, _ = get_user_tokens(request)
+    access_token, _ = get_user_tokens(request, need_refresh=False)
     return access_token
 
 
@@ -119,17 +222,16 @@ async def get_user_id_from_token(token: str) -> Optional[str]:
         user_data = await langflow_repo.get_current_user(token)
 
         user_id = user_data.get("id") or user_data.get("sub")
-        print(f"USER_ID FROM TOKEN: {user_id}")
 
         if user_id:
-            print(f"Successfully validated user ID: {user_id}")
+            logger.debug("Successfully validated user ID: %s", user_id)
             return str(user_id)
         else:
-            print("No user ID found in Langflow response")
+            logger.warning("No user ID found in Langflow response")
             return None
 
     except Exception as e:
-        print(f"Error validating user ID with Langflow: {e}")
+        logger.warning("Error validating user ID with Langflow: %s", e)
         return None
 
 
@@ -142,24 +244,25 @@ async def get_user_id_from_request(request: Request) -> Optional[str]:
         return await get_user_id_from_token(access_token)
 
     except Exception as e:
-        print(f"Error getting user info: {e}")
+        logger.warning("Error getting user info: %s", e)
         return None
 
 
-def get_token_info(token: str) -> Optional[Dict[str, Any]]:
+def get_token_info(token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
     """
     Get all information from a JWT token
 
     Args:
         token: JWT token string
+        now: Current epoch time, read from the clock if not given
 
     Returns:
         Dictionary with token information, None if invalid
     """
     try:
-        decoded = jwt.decode(token, options={"verify_signature": False})
+        current_time = int(time.time() if now is None else now)
+        decoded = _decode_cached(token, current_time)
 
-        current_time = int(time.time())
         exp_time = decoded.get("exp", 0)
         time_remaining = max(0, exp_time - current_time)
 
@@ -173,7 +276,7 @@ def get_token_info(token: str) -> Optional[Dict[str, Any]]:
         }
 
     except Exception as e:
-        print(f"Error getting token info: {e}")
+        logger.warning("Error getting token info: %s", e)
         return None
 
 
@@ -192,7 +295,9 @@ def get_user_info_from_request(request: Request) -> Optional[Dict[str, Any]]:
     if not access_token:
         return None
 
-    access_info = get_token_info(access_token)
+    now = time.time()
+
+    access_info = get_token_info(access_token, now)
     if not access_info:
         return None
 
@@ -204,31 +309,32 @@ def get_user_info_from_request(request: Request) -> Optional[Dict[str, Any]]:
 
     # Add refresh token info if available
     if refresh_token:
-        refresh_info = get_token_info(refresh_token)
+        refresh_info = get_token_info(refresh_token, now)
         if refresh_info:
             result["refresh_token_info"] = refresh_info
 
     return result
 
 
-def is_token_valid(token: str, min_time_remaining: int = 0) -> bool:
+def is_token_valid(token: str, min_time_remaining: int = 0, now: Optional[float] = None) -> bool:
     """
     Check if a token is valid and not expired
 
     Args:
         token: JWT token string
         min_time_remaining: Minimum seconds that must remain before expiry
+        now: Current epoch time, read from the clock if not given
 
     Returns:
         True if token is valid and has enough time remaining
     """
     try:
-        decoded = jwt.decode(token, options={"verify_signature": False})
+        current_time = int(time.time() if now is None else now)
+        decoded = _decode_cached(token, current_time)
 
         if not decoded.get("sub") or not decoded.get("exp"):
             return False
 
-        current_time = int(time.time())
         exp_time = decoded.get("exp", 0)
         time_remaining = exp_time - current_time
 
@@ -262,19 +368,27 @@ async def get_admin_token(langflow_repo) -> str:
             _admin_token_cache["expiry"] > current_time + TOKEN_EXPIRY_BUFFER):
         return _admin_token_cache["token"]
 
-    token_data = await langflow_repo.authenticate_user(
-        SUPERUSER_USERNAME, SUPERUSER_PASSWORD
-    )
+    # Only one coroutine re-authenticates; the others wait and reuse its token
+    async with _admin_token_lock:
+        current_time = time.time()
 
-    access_token = token_data.get("access_token")
-    if not access_token:
-        raise ValueError("Admin authentication failed")
+        if (_admin_token_cache["token"] and
+                _admin_token_cache["expiry"] > current_time + TOKEN_EXPIRY_BUFFER):
+            return _admin_token_cache["token"]
+
+        token_data = await langflow_repo.authenticate_user(
+            SUPERUSER_USERNAME, SUPERUSER_PASSWORD
+        )
+
+        access_token = token_data.get("access_token")
+        if not access_token:
+            raise ValueError("Admin authentication failed")
 
-    expiry = get_token_expiry(access_token)
-    _admin_token_cache["token"] = access_token
-    _admin_token_cache["expiry"] = expiry
+        expiry = get_token_expiry(access_token)
+        _admin_token_cache["token"] = access_token
+        _admin_token_cache["expiry"] = expiry
 
-    print(f"New admin token obtained, expires in {int((expiry - current_time) / 60)} minutes")
+    logger.info("New admin token obtained, expires in %d minutes", int((expiry - current_time) / 60))
     return access_token
 
 
@@ -282,7 +396,7 @@ def clear_admin_token_cache():
     """Clear the cached admin token"""
     global _admin_token_cache
     _admin_token_cache = {"token": None, "expiry": 0}
-    print("Admin token cache cleared")
+    logger.info("Admin token cache cleared")
 
 
 def get_admin_token_info() -> Dict[str, Any]:
@@ -1,138 +1,163 @@
 import re
-import base64
 import os
-from typing import Dict, Any, Optional, Tuple, List
+import logging
+from typing import Dict, Any, Optional, Tuple, List, Sequence
+
+logger = logging.getLogger(__name__)
 
 PPTX_MAGIC_BYTES = os.getenv("PPTX_MAGIC_BYTES")
 DOCX_MAGIC_BYTES = os.getenv("DOCX_MAGIC_BYTES")
 
+_FILE_BLOCK_TEMPLATE = r'<{marker}>\s*filename:([^\n]+)\s*content_type:([^\n]+)\s*size:(\d+)\s*data:([^\n<]+)\s*</{marker}>'
+
+_PPTX_RE = re.compile(_FILE_BLOCK_TEMPLATE.format(marker=PPTX_MAGIC_BYTES), re.MULTILINE | re.DOTALL)
+_DOCX_RE = re.compile(_FILE_BLOCK_TEMPLATE.format(marker=DOCX_MAGIC_BYTES), re.MULTILINE | re.DOTALL)
+
+_FILE_BLOCK_PATTERNS = (
+    (f"<{PPTX_MAGIC_BYTES}>", _PPTX_RE),
+    (f"<{DOCX_MAGIC_BYTES}>", _DOCX_RE),
+)
+
+# Other places the agent's reply can live inside a Langflow output, tried in order
+_FALLBACK_MESSAGE_PATHS = (
+    ("results", "message", "text"),
+    ("outputs", "message", "message"),
+    ("message", "message"),
+    ("artifacts", "message"),
+    ("text",),
+    ("content",),
+    ("response",),
+    ("output",),
+)
+
 
 def extract_generated_files(text: str) -> Tuple[str, List[Dict[str, Any]]]:
     """
     Extract all generated files (both PPTX and DOCX) from text
     Returns: (cleaned_text, list_of_file_data)
     """
-    pptx_pattern = rf'<{PPTX_MAGIC_BYTES}>\s*filename:([^\n]+)\s*content_type:([^\n]+)\s*size:(\d+)\s*data:([^\n<]+)\s*</{PPTX_MAGIC_BYTES}>'
-    docx_pattern = rf'<{DOCX_MAGIC_BYTES}>\s*filename:([^\n]+)\s*content_type:([^\n]+)\s*size:(\d+)\s*data:([^\n<]+)\s*</{DOCX_MAGIC_BYTES}>'
-
     files_found = []
-    cleaned_text = text
+    removed_spans = []
+
+    for opening_tag, pattern in _FILE_BLOCK_PATTERNS:
+        # Most responses carry no file, so skip the regex unless the marker is present,
+        # and start scanning at the first marker rather than the beginning of the text
+        first_tag = text.find(opening_tag)
+        if first_tag == -1:
+            continue
+        for match in pattern.finditer(text, first_tag):
+            file_data = extract_file_from_match(match)
+            if file_data:
+                files_found.append(file_data)
+                removed_spans.append(match.span())
+
+    if not removed_spans:
+        return text.strip(), files_found
+
+    removed_spans.sort()
+    parts = []
+    last_end = 0
+    for start, end in removed_spans:
+        parts.append(text[last_end:start])
+        last_end = end
+    parts.append(text[last_end:])
+
+    cleaned_text = "".join(parts).strip()
 
-    pptx_matches = re.finditer(pptx_pattern, text, re.MULTILINE | re.DOTALL)
-    for match in pptx_matches:
-        file_data = extract_file_from_match(match)
-        if file_data:
-            files_found.append(file_data)
-            cleaned_text = re.sub(re.escape(match.group(0)), '', cleaned_text, count=1)
-
-    docx_matches = re.finditer(docx_pattern, text, re.MULTILINE | re.DOTALL)
-    for match in docx_matches:
-        file_data = extract_file_from_match(match)
-        if file_data:
-            files_found.append(file_data)
-            cleaned_text = re.sub(re.escape(match.group(0)), '', cleaned_text, count=1)
+    return cleaned_text, files_found
 
-    cleaned_text = cleaned_text.strip()
 
-    return cleaned_text, files_found
+def _decoded_base64_length(base64_data: str) -> int:
+    """
+    Compute the decoded byte length of a base64 string without decoding it
+    """
+    return (len(base64_data) * 3) // 4 - base64_data.count('=', -2)
 
 
-def extract_file_from_match(match) -> Optional[Dict[str, Any]]:
+def extract_file_from_match(match: re.Match) -> Optional[Dict[str, Any]]:
     try:
         filename = match.group(1).strip()
         content_type = match.group(2).strip()
         size = int(match.group(3).strip())
         base64_data = match.group(4).strip()
 
-        file_content = base64.b64decode(base64_data)
-
-        if len(file_content) != size:
-            print(f"Warning: File size mismatch for {filename}. Expected {size}, got {len(file_content)}")
+        decoded_size = _decoded_base64_length(base64_data)
+        if decoded_size != size:
+            logger.warning("File size mismatch for %s. Expected %d, got %d", filename, size, decoded_size)
 
         return {
             "filename": filename,
             "content_type": content_type,
             "size": size,
-            "content": file_content,
             "base64_data": base64_data
         }
 
     except Exception as e:
-        print(f"Error parsing file from match: {e}")
+        logger.error("Error parsing file from match: %s", e)
         return None
 
 
+def _walk(node: Any, path: Tuple[Any, ...]) -> Any:
+    """
+    Follow a path of dict keys / list indices, returning None as soon as a step is missing
+    """
+    for part in path:
+        if isinstance(part, int):
+            if not isinstance(node, list) or len(node) <= part:
+                return None
+            node = node[part]
+        else:
+            if not isinstance(node, dict):
+                return None
+            node = node.get(part)
+        if node is None:
+            return None
+    return node
+
+
 def extract_bot_response(data: Dict[str, Any]) -> str:
     """
     Extracts the actual text message from LangFlow's complex response structure
     """
     try:
-        if not data.get("outputs") or not isinstance(data["outputs"], list):
+        outputs = data.get("outputs")
+        if not outputs or not isinstance(outputs, list):
             return "Invalid response structure from LangFlow."
 
-        if len(data["outputs"]) == 0:
-            return "No response provided by the agent."
-
-        first_output = data["outputs"][0]
-
-        if not first_output.get("outputs"):
+        component_outputs = outputs[0].get("outputs")
+        if not component_outputs:
             return "No response provided by the agent."
 
-        if len(first_output["outputs"]) == 0:
-            return "No response provided by the agent."
-
-        message_output = first_output["outputs"][0]
-
-        if (message_output.get("messages") and
-                isinstance(message_output["messages"], list) and
-                len(message_output["messages"]) > 0):
-
-            message = message_output["messages"][0].get("message", "").strip()
-            if message:
-                return message
-
-        # Method 2: Check results.message.text
-        if (message_output.get("results", {}).get("message", {}).get("text")):
-            text = message_output["results"]["message"]["text"].strip()
-            if text:
-                return text
-
-        # Method 3: Check outputs.message.message
-        if (message_output.get("outputs", {}).get("message", {}).get("message")):
-            message = message_output["outputs"]["message"]["message"].strip()
-            if message:
-                return message
-
-        # Method 4: Check direct message field
-        if message_output.get("message", {}).get("message"):
-            message = message_output["message"]["message"].strip()
-            if message:
-                return message
+        message_output = component_outputs[0]
 
-        # Method 5: Check artifacts
-        if (message_output.get("artifacts", {}).get("message")):
-            message = str(message_output["artifacts"]["message"]).strip()
+        # Fast path: chat outputs carry the reply in messages[0].message
+        messages = message_output.get("messages")
+        if messages and isinstance(messages, list):
+            first_message = messages[0]
+            message = first_message.get("message") if isinstance(first_message, dict) else None
             if message:
-                return message
+                text = str(message).strip()
+                if text:
+                    return text
 
-        # Method 6: Check if there's any text-like content
-        for key in ["text", "content", "response", "output"]:
-            if message_output.get(key):
-                content = str(message_output[key]).strip()
-                if content:
-                    return content
+        for path in _FALLBACK_MESSAGE_PATHS:
+            value = _walk(message_output, path)
+            if value:
+                text = str(value).strip()
+                if text:
+                    return text
 
         return "No response provided by the agent."
 
     except KeyError as e:
-        print(f"Missing expected key in response: {e}")
+        logger.warning("Missing expected key in response: %s", e)
         return "Response structure incomplete."
     except Exception as err:
-        print(f"Error extracting bot response: {err}")
+        logger.error("Error extracting bot response: %s", err)
         return "Failed to parse response from the agent."
 
 
-def extract_bot_response_with_files(data: Dict[str, Any]) -> Tuple[str, List[Optional[Dict[str, Any]]]]:
+def extract_bot_response_with_files(data: Dict[str, Any]) -> Tuple[str, Sequence[Optional[Dict[str, Any]]]]:
     """
     Enhanced version that returns both the cleaned text and file data
 
@@ -147,5 +172,5 @@ def extract_bot_response_with_files(data: Dict[str, Any]) -> Tuple[str, List[Opt
         return cleaned_text, file_data
 
     except Exception as err:
-        print(f"Error extracting bot response with files: {err}")
+        logger.error("Error extracting bot response with files: %s", err)
         return "Failed to parse response from the agent.", [None]
@@ -1,54 +1,157 @@
+from dataclasses import dataclass, field, replace
 from datetime import datetime, UTC
 import threading
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+_ENTRY_FIELDS = ("flow_id", "status", "started_at", "started_at_ts", "last_updated")
+
+
+@dataclass(frozen=True, slots=True)
+class FileEntry:
+    """Immutable state of a tracked file; unknown keys are kept in extra"""
+    flow_id: Optional[str]
+    started_at: str
+    started_at_ts: float
+    status: str = "processing"
+    last_updated: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def with_updates(self, updates: Dict[str, Any]) -> "FileEntry":
+        """Return a copy with updates applied to the fixed fields or to extra"""
+        known = {key: value for key, value in updates.items() if key in _ENTRY_FIELDS}
+        extra = {key: value for key, value in updates.items() if key not in _ENTRY_FIELDS}
+        if extra:
+            known["extra"] = {**self.extra, **extra}
+        return replace(self, **known)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flatten into the dict shape exposed to callers"""
+        result = {
+            **self.extra,
+            "flow_id": self.flow_id,
+            "status": self.status,
+            "started_at": self.started_at,
+        }
+        if self.last_updated is not None:
+            result["last_updated"] = self.last_updated
+        return result
 
 
 class ProcessingFileTracker:
-    """Thread-safe tracker for files being processed in background tasks"""
+    """
+    Thread-safe tracker for files being processed in background tasks.
+
+    Writers serialize on a lock and publish a fresh copy of the state, so readers can use
+    the current snapshot without locking. Entries are immutable FileEntry objects.
+    """
     def __init__(self):
-        self._processing_files: Dict[str, Dict[str, Any]] = {}
+        self._processing_files: Dict[str, FileEntry] = {}
+        self._files_by_flow: Dict[str, Tuple[str, ...]] = {}
         self._lock = threading.Lock()
 
     def get_file_info(self, file_id: str) -> Optional[Dict[str, Any]]:
         """Get file information by file_id"""
-        return self._processing_files.get(file_id)
+        entry = self._processing_files.get(file_id)
+        return entry.to_dict() if entry is not None else None
 
     def add_file(self, file_id: str, file_info: Dict[str, Any]) -> None:
         """Add a file to the processing tracker"""
+        now = time.time()
+        entry = FileEntry(
+            flow_id=file_info.get("flow_id"),
+            started_at=self._now_iso(now),
+            started_at_ts=now,
+            extra={key: value for key, value in file_info.items() if key not in _ENTRY_FIELDS},
+        )
         with self._lock:
-            self._processing_files[file_id] = {
-                **file_info,
-                "status": "processing",
-                "started_at": datetime.now(UTC).isoformat(),
-            }
+            files = dict(self._processing_files)
+            files[file_id] = entry
+            self._processing_files = files
+            self._index_file(file_id, entry.flow_id)
         print(f"Added file to processing tracker: {file_id}")
 
     def remove_file(self, file_id: str) -> None:
         """Remove a file from the processing tracker (when processing completes)"""
         with self._lock:
             if file_id in self._processing_files:
-                del self._processing_files[file_id]
+                self._unindex_file(file_id, self._processing_files[file_id].flow_id)
+                files = dict(self._processing_files)
+                del files[file_id]
+                self._processing_files = files
                 print(f"Removed file from processing tracker: {file_id}")
 
     def update_file(self, file_id: str, updates: Dict[str, Any]) -> None:
         """Update file information in the tracker"""
         with self._lock:
-            if file_id in self._processing_files:
-                self._processing_files[file_id].update(updates)
-                self._processing_files[file_id]["last_updated"] = datetime.now(UTC).isoformat()
+            current = self._processing_files.get(file_id)
+            if current is not None:
+                updated = current.with_updates({
+                    **updates,
+                    "last_updated": self._now_iso(time.time()),
+                })
+                if updated.flow_id != current.flow_id:
+                    self._unindex_file(file_id, current.flow_id)
+                    self._index_file(file_id, updated.flow_id)
+                files = dict(self._processing_files)
+                files[file_id] = updated
+                self._processing_files = files
 
     def get_files_for_flow(self, flow_id: str) -> List[Dict[str, Any]]:
         """Get all files currently being processed for a specific flow"""
-        with self._lock:
-            return [
-                file_info for file_info in self._processing_files.values()
-                if file_info.get("flow_id") == flow_id
-            ]
+        file_ids = self._files_by_flow.get(flow_id, ())
+        files = self._processing_files
+        return [files[file_id].to_dict() for file_id in file_ids if file_id in files]
 
     def is_processing(self, file_id: str) -> bool:
         """Check if a file is currently being processed"""
+        return file_id in self._processing_files
+
+    def cleanup_stale_files(self, max_age_hours: float = 24) -> int:
+        """
+        Drop files that have been tracked for longer than max_age_hours
+
+        Returns:
+            Number of removed entries
+        """
+        cutoff = time.time() - max_age_hours * 3600
         with self._lock:
-            return file_id in self._processing_files
+            stale = [
+                file_id for file_id, entry in self._processing_files.items()
+                if entry.started_at_ts < cutoff
+            ]
+            if not stale:
+                return 0
+
+            files = dict(self._processing_files)
+            for file_id in stale:
+                self._unindex_file(file_id, files[file_id].flow_id)
+                del files[file_id]
+            self._processing_files = files
+
+        print(f"Removed {len(stale)} stale files from processing tracker")
+        return len(stale)
+
+    @staticmethod
+    def _now_iso(now: float) -> str:
+        """ISO timestamp for an epoch value, with the microseconds of datetime.now(UTC).isoformat()"""
+        return datetime.fromtimestamp(now, UTC).isoformat()
+
+    def _index_file(self, file_id: str, flow_id: Optional[str]) -> None:
+        """Add file_id to the flow index (caller holds the lock)"""
+        index = dict(self._files_by_flow)
+        index[flow_id] = index.get(flow_id, ()) + (file_id,)
+        self._files_by_flow = index
+
+    def _unindex_file(self, file_id: str, flow_id: Optional[str]) -> None:
+        """Remove file_id from the flow index (caller holds the lock)"""
+        index = dict(self._files_by_flow)
+        remaining = tuple(fid for fid in index.get(flow_id, ()) if fid != file_id)
+        if remaining:
+            index[flow_id] = remaining
+        else:
+            index.pop(flow_id, None)
+        self._files_by_flow = index
 
 
 processing_tracker = ProcessingFileTracker()
@@ -0,0 +1,88 @@
+from typing import Iterator
+
+
+def iter_chunks(content: str, chunk_size: int, chunk_overlap: int) -> Iterator[str]:
+    """
+    Lazily split text into overlapping chunks, skipping whitespace-only chunks.
+    Windowing stops at the chunk that reaches the end of the text, so no trailing
+    chunk consisting only of overlap is produced.
+
+    Args:
+        content: Text to split
+        chunk_size: Number of characters per chunk
+        chunk_overlap: Number of characters shared by consecutive chunks
+
+    Yields:
+        Chunks in document order
+
+    Raises:
+        ValueError: If the overlap is not smaller than the chunk size
+    """
+    stride = chunk_size - chunk_overlap
+    if stride <= 0:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    content_length = len(content)
+    for start in range(0, content_length, stride):
+        # The previous window already ended at start + chunk_overlap
+        if start and start + chunk_overlap >= content_length:
+            break
+
+        chunk = content[start:start + chunk_size]
+        if chunk.strip():
+            yield chunk
+
+
+FILE_READ_BLOCK_SIZE = 1 << 16
+
+
+def iter_file_chunks(file_path: str, chunk_size: int, chunk_overlap: int,
+                     encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Stream a text file from disk and yield the same chunks iter_chunks would produce
+    for its full content, keeping only about one read block in memory
+
+    Args:
+        file_path: Path to the text file
+        chunk_size: Number of characters per chunk
+        chunk_overlap: Number of characters shared by consecutive chunks
+        encoding: Text encoding of the file
+
+    Yields:
+        Non-blank chunks in document order
+
+    Raises:
+        ValueError: If the overlap is not smaller than the chunk size
+    """
+    stride = chunk_size - chunk_overlap
+    if stride <= 0:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    buffer = ""
+    position = 0
+    eof = False
+    started = False
+
+    with open(file_path, "r", encoding=encoding, buffering=1 << 20) as f:
+        while True:
+            # Refill until a full chunk is available, compacting consumed text away
+            while not eof and len(buffer) - position < chunk_size:
+                data = f.read(FILE_READ_BLOCK_SIZE)
+                if not data:
+                    eof = True
+                    break
+                buffer = buffer[position:] + data
+                position = 0
+
+            if position >= len(buffer):
+                break
+
+            # Everything left was already covered by the previous window's overlap
+            if started and eof and position + chunk_overlap >= len(buffer):
+                break
+
+            chunk = buffer[position:position + chunk_size]
+            if chunk.strip():
+                yield chunk
+            position += stride
+            started = True
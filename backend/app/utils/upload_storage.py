@@ -0,0 +1,37 @@
+import asyncio
+import os
+from typing import BinaryIO, Union
+
+from fastapi import UploadFile
+
+UPLOAD_COPY_BUFFER_SIZE = 1 << 20
+
+
+def _copy_to_path(source: BinaryIO, destination: Union[str, os.PathLike]) -> int:
+    """Copy a file object to disk in fixed-size blocks and return the number of bytes written"""
+    bytes_written = 0
+    with open(destination, "wb") as target:
+        while True:
+            block = source.read(UPLOAD_COPY_BUFFER_SIZE)
+            if not block:
+                break
+            target.write(block)
+            bytes_written += len(block)
+    return bytes_written
+
+
+async def save_upload_file(file: UploadFile, destination: Union[str, os.PathLike]) -> int:
+    """
+    Stream an uploaded file to disk without loading it into memory
+
+    The copy runs in a worker thread, so neither reading the spooled upload nor
+    writing the destination blocks the event loop.
+
+    Args:
+        file: Uploaded file, read from its current position
+        destination: Path to write the file to
+
+    Returns:
+        Number of bytes written
+    """
+    return await asyncio.to_thread(_copy_to_path, file.file, destination)
@@ -7,6 +7,23 @@ load_dotenv()
 if __name__ == "__main__":
     host = os.getenv("SERVER_HOST", "0.0.0.0")
     port = int(os.getenv("SERVER_PORT", "8000"))
+    reload = os.getenv("BACKEND_RELOAD", "false").strip().lower() in ("1", "true", "yes")
+    # Upload processing status lives in process memory, so more than one worker only
+    # suits deployments that do not poll it; the reloader always runs a single process
+    workers = 1 if reload else int(os.getenv("BACKEND_WORKERS", "1"))
+    limit_concurrency = int(os.getenv("BACKEND_LIMIT_CONCURRENCY", "0")) or None
+    backlog = int(os.getenv("BACKEND_BACKLOG", "2048"))
 
-    print(f"Starting server at http://{host}:{port}")
-    uvicorn.run("app.main:app", host=host, port=port, reload=True)
\ No newline at end of file
+    print(f"Starting server at http://{host}:{port} with {workers} worker(s), reload={'on' if reload else 'off'}")
+    # loop/http "auto" pick uvloop and httptools (see requirements.txt) when they are installed
+    uvicorn.run(
+        "app.main:app",
+        host=host,
+        port=port,
+        reload=reload,
+        workers=workers,
+        limit_concurrency=limit_concurrency,
+        backlog=backlog,
+        loop="auto",
+        http="auto"
+    )
@@ -6,18 +6,27 @@ import google.generativeai as genai
 from pptx.dml.color import RGBColor
 from PIL import Image
 import io
+import heapq
+import logging
+import re
 import base64
 import tempfile
 import os
 from pptx import Presentation
-from typing import List, Dict, Tuple, Any
+from pptx.shapes.picture import Picture
+from typing import List, Dict, Tuple, Any, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 PPTX_MAGIC_BYTES = os.getenv("PPTX_MAGIC_BYTES")
 TEMPLATE_PATH = os.getenv("TEMPLATE_PATH")
 
+# Everything except letters, digits, ' ', '-' and '_' (\w is str.isalnum() plus '_')
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w \-]")
+
 
 class CombinedPPTXExtractorCreator(Component):
     display_name = "Case Study Library Transformator"
@@ -42,40 +51,42 @@ class CombinedPPTXExtractorCreator(Component):
         )
     ]
 
-    def is_pptx_file(self, file_data: bytes) -> bool:
-        """Check if the file data represents a valid PPTX file"""
+    def open_pptx(self, file_data: bytes) -> Optional[Presentation]:
+        """
+        Parse the file data as a PPTX presentation
+
+        The parsed presentation is used for extraction as well, so each source
+        file is only unzipped and parsed once.
+
+        Returns:
+            The presentation, None if the data is not a valid PPTX file
+        """
         try:
             if not file_data.startswith(b'PK\x03\x04'):
-                return False
+                return None
 
-            with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_file:
-                temp_file.write(file_data)
-                temp_file_path = temp_file.name
-
-            try:
-                prs = Presentation(temp_file_path)
-                _ = len(prs.slides)
-                return True
-            except Exception:
-                return False
-            finally:
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+            prs = Presentation(io.BytesIO(file_data))
+            _ = len(prs.slides)
+            return prs
 
         except Exception:
-            return False
+            return None
 
     def get_text_shapes_from_slide(self, slide) -> List[Dict]:
         """Extract all text shapes from a slide with their spatial information"""
         text_shapes = []
 
         for shape in slide.shapes:
-            if hasattr(shape, 'text_frame') and shape.text_frame.text.strip():
-                text = shape.text_frame.text.strip()
+            if not hasattr(shape, 'text_frame'):
+                continue
+
+            # text_frame.text rebuilds the string from the XML, so read it only once
+            text = shape.text_frame.text.strip()
+            if text:
                 text_shapes.append({
                     'text': text,
+                    # Lowercased once here instead of on every title lookup
+                    'text_lower': text.lower(),
                     'left': shape.left,
                     'top': shape.top,
                     'width': shape.width,
@@ -84,54 +95,52 @@ class CombinedPPTXExtractorCreator(Component):
 
         return text_shapes
 
-    def find_text_below_title(self, text_shapes: List[Dict], title_keywords: List[str], x_margin: int = 720000) -> str:
+    def find_title_shapes(self, text_shapes: List[Dict], title_keywords: List[str]) -> Dict[str, Dict]:
+        """
+        Find the first title shape containing each keyword, in a single pass over the text shapes
+        """
+        keywords = [(keyword, keyword.lower()) for keyword in title_keywords]
+        title_shapes = {}
+
+        for shape in text_shapes:
+            if len(shape['text']) > 50:  # Too long to be a title
+                continue
+
+            for keyword, keyword_lower in keywords:
+                if keyword not in title_shapes and keyword_lower in shape['text_lower']:
+                    title_shapes[keyword] = shape
+
+            if len(title_shapes) == len(keywords):
+                break
+
+        return title_shapes
+
+    def find_texts_below_titles(self, text_shapes: List[Dict], title_shapes: Dict[str, Dict],
+                                x_margin: int = 720000) -> Dict[str, str]:
         """
-        Find a title with any of the keywords (in order) and return the first text field below it with similar x-coordinate
+        For every found title, find the closest text field below it with similar x-coordinate,
+        in a single pass over the text shapes. Titles without such a field are left out.
         """
-        # Try each keyword in order until we find a match
-        for keyword in title_keywords:
-            title_shape = None
-
-            # Find the title shape containing this specific keyword
-            for shape in text_shapes:
-                text_lower = shape['text'].lower().strip()
-                if keyword.lower() in text_lower and len(shape['text']) <= 50:  # Likely a title
-                    title_shape = shape
-                    break
-
-            # If we found a title with this keyword, look for content below it
-            if title_shape:
-                title_x = title_shape['left']
-                title_y = title_shape['top']
-
-                # Find text fields below the title with similar x-coordinate
-                candidates = []
-
-                for shape in text_shapes:
-                    # Skip the title itself
-                    if shape['left'] == title_x and shape['top'] == title_y:
-                        continue
-
-                    # Must be below the title
-                    if shape['top'] <= title_y:
-                        continue
-
-                    # Check if x-coordinate is within margin
-                    x_distance = abs(shape['left'] - title_x)
-                    if x_distance <= x_margin:
-                        y_distance = shape['top'] - title_y
-                        candidates.append({
-                            'text': shape['text'],
-                            'y_distance': y_distance,
-                            'x_distance': x_distance
-                        })
-
-                if candidates:
-                    # Sort by y_distance (closest below the title) then by x_distance
-                    candidates.sort(key=lambda x: (x['y_distance'], x['x_distance']))
-                    return candidates[0]['text']
-
-        return ""
+        # Per title: (y_distance, x_distance, index) of the closest field so far
+        closest: Dict[str, Tuple[int, int, int]] = {}
+
+        for index, shape in enumerate(text_shapes):
+            for keyword, title_shape in title_shapes.items():
+                y_distance = shape['top'] - title_shape['top']
+                # Must be below the title (which also skips the title itself)
+                if y_distance <= 0:
+                    continue
+
+                x_distance = abs(shape['left'] - title_shape['left'])
+                if x_distance > x_margin:
+                    continue
+
+                # Smallest y_distance, then x_distance; the earliest shape wins ties
+                candidate = (y_distance, x_distance, index)
+                if keyword not in closest or candidate < closest[keyword]:
+                    closest[keyword] = candidate
+
+        return {keyword: text_shapes[candidate[2]]['text'] for keyword, candidate in closest.items()}
 
     def find_project_name(self, text_shapes: List[Dict], target_x_cm: float = 1.19, margin_cm: float = 0.2) -> str:
         """
@@ -142,24 +151,16 @@ class CombinedPPTXExtractorCreator(Component):
         target_x_emu = int(target_x_cm * 360000)
         margin_emu = int(margin_cm * 360000)
 
-        # Find all text shapes at the target x position (within margin)
-        candidates = []
-
-        for shape in text_shapes:
-            x_distance = abs(shape['left'] - target_x_emu)
-            if x_distance <= margin_emu:
-                candidates.append({
-                    'text': shape['text'],
-                    'top': shape['top'],
-                    'y_position': shape['top']
-                })
+        # The two highest text shapes at the target x position (within margin), top to bottom
+        candidates = heapq.nsmallest(
+            2,
+            (shape for shape in text_shapes if abs(shape['left'] - target_x_emu) <= margin_emu),
+            key=lambda shape: shape['top']
+        )
 
         if len(candidates) < 2:
             return ""  # Need at least 2 elements (sector and project name)
 
-        # Sort by y position (top to bottom)
-        candidates.sort(key=lambda x: x['y_position'])
-
         # Return the second highest (index 1) - this should be the project name
         return candidates[1]['text']
 
@@ -182,31 +183,27 @@ class CombinedPPTXExtractorCreator(Component):
         bottom_bound = target_y_emu + height_emu
 
         for shape in slide.shapes:
-            # Check if shape is an image/picture
-            if hasattr(shape, 'image'):
-                # Check if the shape is within our target area
-                shape_left = shape.left
-                shape_top = shape.top
-                shape_right = shape.left + shape.width
-                shape_bottom = shape.top + shape.height
-
-                # Check if shape overlaps with our target area
-                if (shape_left < right_bound and shape_right > left_bound and
-                        shape_top < bottom_bound and shape_bottom > top_bound):
-
-                    try:
-                        # Extract the image data
-                        image = shape.image
-                        image_bytes = image.blob
-
-                        # Convert to base64
-                        import base64
-                        base64_content = base64.b64encode(image_bytes).decode('utf-8')
-                        return base64_content
-
-                    except Exception as e:
-                        # If extraction fails, continue to next shape
-                        continue
+            # Only pictures can be logos; the isinstance check does not touch the image part
+            if not isinstance(shape, Picture):
+                continue
+
+            # Position and size come from the shape XML, so unrelated pictures are skipped
+            # before their image data is loaded
+            shape_left = shape.left
+            shape_top = shape.top
+            shape_right = shape.left + shape.width
+            shape_bottom = shape.top + shape.height
+
+            if not (shape_left < right_bound and shape_right > left_bound and
+                    shape_top < bottom_bound and shape_bottom > top_bound):
+                continue
+
+            try:
+                # The blob is already in the picture's original format, no decoding needed
+                return base64.b64encode(shape.image.blob).decode('utf-8')
+            except Exception:
+                # If extraction fails, continue to next shape
+                continue
 
         return ""  # No logo found in the specified area
 
@@ -280,10 +277,12 @@ class CombinedPPTXExtractorCreator(Component):
     def extract_fields_from_slide(self, slide, slide_number: int) -> Dict[str, str]:
         """Extract Challenge, Solution, and Value from a single slide"""
         text_shapes = self.get_text_shapes_from_slide(slide)
+        title_shapes = self.find_title_shapes(text_shapes, ["Challenge", "Solution", "Value", "Business Benefits"])
+        texts_below = self.find_texts_below_titles(text_shapes, title_shapes)
 
-        challenge = self.find_text_below_title(text_shapes, ["Challenge"])
-        solution = self.find_text_below_title(text_shapes, ["Solution"])
-        business_impact = self.find_text_below_title(text_shapes, ["Value", "Business Benefits"])
+        challenge = texts_below.get("Challenge", "")
+        solution = texts_below.get("Solution", "")
+        business_impact = texts_below.get("Value") or texts_below.get("Business Benefits", "")
         project_name = self.find_project_name(text_shapes)
         logo_base64 = self.find_logo_in_area(slide)
         analysis_result = self.analyze_client_agent(logo_base64, challenge, solution, business_impact, project_name)
@@ -355,17 +354,18 @@ class CombinedPPTXExtractorCreator(Component):
                 background = Image.new('RGB', img.size, (255, 255, 255))
                 if img.mode == 'P':
                     img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+                background.paste(img, mask=img.getchannel('A'))
                 img = background
 
             img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
+            # Fast deflate: the buffer is only an intermediate copy for the slide
+            img.save(img_buffer, format='PNG', optimize=False, compress_level=1)
             img_buffer.seek(0)
 
             return img_buffer.getvalue(), img.size
 
         except Exception as e:
-            print(f"Error decoding base64 image: {e}")
+            logger.warning("Error decoding base64 image: %s", e)
             return None, None
 
     def add_logo_to_slide(self, slide, logo_base64):
@@ -425,7 +425,7 @@ class CombinedPPTXExtractorCreator(Component):
                     pass
 
         except Exception as e:
-            print(f"Error adding logo to slide: {e}")
+            logger.warning("Error adding logo to slide: %s", e)
             return False
 
     def create_powerpoint_from_data(self, reference_data: Dict[str, str], reference_index: int) -> str:
@@ -452,24 +452,16 @@ class CombinedPPTXExtractorCreator(Component):
                 if slide_idx == 0 and reference_data['logo_base64']:
                     self.add_logo_to_slide(slide, reference_data['logo_base64'])
 
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.pptx', delete=False)
-            temp_file_path = temp_file.name
-            temp_file.close()
-
-            prs.save(temp_file_path)
-
-            # Read and encode
-            with open(temp_file_path, 'rb') as f:
-                file_content = f.read()
-
-            os.unlink(temp_file_path)
+            # Save in memory; the package is only needed as bytes
+            buffer = io.BytesIO()
+            prs.save(buffer)
+            file_content = buffer.getvalue()
 
             # Encode to base64
             base64_content = base64.b64encode(file_content).decode('utf-8')
 
             client_name = reference_data['customer_name']
-            safe_client_name = "".join(c for c in client_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            safe_client_name = _UNSAFE_FILENAME_CHARS.sub("", client_name).rstrip()
             safe_client_name = safe_client_name.replace(' ', '_')
             if safe_client_name and safe_client_name != "Unknown_Client":
                 filename = f"{safe_client_name}_slide_{reference_data['slide_number']}.pptx"
@@ -489,38 +481,26 @@ class CombinedPPTXExtractorCreator(Component):
         except Exception as e:
             return f"Failed to create PowerPoint for reference {reference_index}: {str(e)}\n"
 
-    def extract_and_create_from_pptx(self, file_data: bytes, file_index: int) -> Tuple[bool, str, int]:
-        """Extract data from PPTX and create PowerPoint files for each valid reference"""
+    def extract_and_create_from_pptx(self, prs: Presentation, file_index: int) -> Tuple[bool, str, int]:
+        """Extract data from a parsed PPTX and create PowerPoint files for each valid reference"""
         try:
-            with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_file:
-                temp_file.write(file_data)
-                temp_file_path = temp_file.name
-
-            try:
-                prs = Presentation(temp_file_path)
-                output_text = f"📊 Processing File {file_index}:\n"
-                powerpoints_created = 0
-                reference_index = 1
-
-                # Process each slide
-                for slide_idx, slide in enumerate(prs.slides, 1):
-                    slide_data = self.extract_fields_from_slide(slide, slide_idx)
+            output_text = f"📊 Processing File {file_index}:\n"
+            powerpoints_created = 0
+            reference_index = 1
 
-                    # Only create PowerPoint if slide has valid content
-                    if self.has_valid_content(slide_data):
-                        powerpoint_result = self.create_powerpoint_from_data(slide_data, reference_index)
-                        output_text += powerpoint_result
-                        powerpoints_created += 1
-                        reference_index += 1
+            # Process each slide
+            for slide_idx, slide in enumerate(prs.slides, 1):
+                slide_data = self.extract_fields_from_slide(slide, slide_idx)
 
-                output_text += f"✅ File {file_index} processed: {powerpoints_created} PowerPoints created from {len(prs.slides)} slides\n\n"
-                return True, output_text, powerpoints_created
+                # Only create PowerPoint if slide has valid content
+                if self.has_valid_content(slide_data):
+                    powerpoint_result = self.create_powerpoint_from_data(slide_data, reference_index)
+                    output_text += powerpoint_result
+                    powerpoints_created += 1
+                    reference_index += 1
 
-            finally:
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+            output_text += f"✅ File {file_index} processed: {powerpoints_created} PowerPoints created from {len(prs.slides)} slides\n\n"
+            return True, output_text, powerpoints_created
 
         except Exception as e:
             return False, f"❌ Error processing file {file_index}: {str(e)}\n", 0
@@ -546,10 +526,11 @@ class CombinedPPTXExtractorCreator(Component):
 
             file_data = base64.b64decode(clean_b64)
 
-            if not self.is_pptx_file(file_data):
+            prs = self.open_pptx(file_data)
+            if prs is None:
                 return f"❌ File {index} is not a valid PPTX format", False, "", 0
 
-            success, content, count = self.extract_and_create_from_pptx(file_data, index)
+            success, content, count = self.extract_and_create_from_pptx(prs, index)
 
             if success:
                 return f"✅ Successfully processed PPTX file {index}", True, content, count
@@ -1,13 +1,15 @@
 import json
 import re
+from lxml import etree
 from pptx import Presentation
 from pptx.util import Inches
 from pptx.dml.color import RGBColor
 from PIL import Image
-import tempfile
 import base64
+import copy
 import os
 import io
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 from langflow.custom import Component
@@ -18,6 +20,46 @@ load_dotenv()
 
 PPTX_MAGIC_BYTES = os.getenv("PPTX_MAGIC_BYTES")
 TEMPLATE_PATH = os.getenv("TEMPLATE_PATH")
+PPTX_MAX_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Logo box on the first slide: (29.81cm, 0.81cm), 2.87cm x 2.53cm
+CM_TO_INCHES = 0.393701
+LOGO_LEFT = Inches(29.81 * CM_TO_INCHES)
+LOGO_TOP = Inches(0.81 * CM_TO_INCHES)
+LOGO_WIDTH = Inches(2.87 * CM_TO_INCHES)
+LOGO_HEIGHT = Inches(2.53 * CM_TO_INCHES)
+
+# Parsed templates per path, keyed by mtime and size so an edited template is read again
+_template_cache = {}
+
+
+def _load_template(template_path):
+    """
+    Parse a template file once per process instead of on every generated presentation.
+    The returned Presentation is shared and must not be modified; work on a copy.deepcopy of it,
+    which clones the parsed XML trees much faster than parsing them again.
+    """
+    stat = os.stat(template_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _template_cache.get(template_path)
+    if cached is None or cached[0] != version:
+        with open(template_path, "rb") as f:
+            cached = (version, Presentation(io.BytesIO(f.read())))
+        _template_cache[template_path] = cached
+
+    return cached[1]
+
+
+_TEXT_ELEMENTS = etree.XPath(
+    ".//a:t", namespaces={"a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+)
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0B-\x1F]")
+
+
+def _escape_ctrl_chars(text):
+    """Escape control characters the way python-pptx does when run text is assigned"""
+    return _CONTROL_CHARS.sub(lambda match: "_x%04X_" % ord(match.group(0)), text)
 
 
 class MultiLanguagePowerPointComponent(Component):
@@ -77,26 +119,34 @@ class MultiLanguagePowerPointComponent(Component):
     #  PPTX helpers (from original component)                              #
     # ------------------------------------------------------------------ #
 
-    def _find_and_replace_text_in_slide(self, slide, replacements):
+    @staticmethod
+    def _compile_placeholder_pattern(replacements):
+        # One alternation of all placeholders, so each text element is scanned in a single pass
+        return re.compile("|".join(re.escape(placeholder) for placeholder in replacements))
+
+    def _find_and_replace_text_in_slide(self, slide, replacements, placeholder_pattern=None):
+        if not replacements:
+            return 0
+        if placeholder_pattern is None:
+            placeholder_pattern = self._compile_placeholder_pattern(replacements)
+
+        def substitute(match):
+            return replacements[match.group(0)]
+
         replacements_made = 0
-        for shape in slide.shapes:
-            if hasattr(shape, "text_frame"):
-                for paragraph in shape.text_frame.paragraphs:
-                    for run in paragraph.runs:
-                        for placeholder, replacement in replacements.items():
-                            if placeholder in run.text:
-                                run.text = run.text.replace(placeholder, replacement)
-                                replacements_made += 1
-
-            elif hasattr(shape, "table"):
-                for row in shape.table.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.text_frame.paragraphs:
-                            for run in paragraph.runs:
-                                for placeholder, replacement in replacements.items():
-                                    if placeholder in run.text:
-                                        run.text = run.text.replace(placeholder, replacement)
-                                        replacements_made += 1
+
+        # One compiled XPath query walks the slide XML for every a:t element (text boxes,
+        # grouped shapes and table cells alike) without building shape/paragraph/run proxies
+        for text_element in _TEXT_ELEMENTS(slide.element):
+            text = text_element.text
+            # Every placeholder starts with "{{", so most elements are skipped without a regex scan
+            if not text or "{{" not in text:
+                continue
+
+            new_text, count = placeholder_pattern.subn(substitute, text)
+            if count:
+                text_element.text = _escape_ctrl_chars(new_text)
+                replacements_made += count
 
         return replacements_made
 
@@ -108,15 +158,33 @@ class MultiLanguagePowerPointComponent(Component):
             image_data = base64.b64decode(base64_string)
             img = Image.open(io.BytesIO(image_data))
 
-            if img.mode in ("RGBA", "LA", "P"):
+            # Opening only reads the header; PNG and JPEG logos that need no flattening
+            # are embedded as they are instead of being decoded and re-encoded
+            if img.format in ("PNG", "JPEG") and img.mode in ("RGB", "L"):
+                return image_data, img.size
+
+            # Logos whose transparency is unused look the same without the white background
+            is_opaque = False
+            if img.mode == "P":
+                is_opaque = "transparency" not in img.info
+            elif img.mode in ("RGBA", "LA"):
+                is_opaque = img.getchannel("A").getextrema()[0] == 255
+
+            if is_opaque:
+                if img.format == "PNG":
+                    return image_data, img.size
+                img = img.convert("RGB")
+
+            elif img.mode in ("RGBA", "LA", "P"):
                 background = Image.new("RGB", img.size, (255, 255, 255))
                 if img.mode == "P":
                     img = img.convert("RGBA")
-                background.paste(img, mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None)
+                background.paste(img, mask=img.getchannel("A"))
                 img = background
 
             buf = io.BytesIO()
-            img.save(buf, format="PNG")
+            # Fast deflate: the buffer is only an intermediate copy for the slide
+            img.save(buf, format="PNG", optimize=False, compress_level=1)
             buf.seek(0)
             return buf.getvalue(), img.size
 
@@ -126,24 +194,8 @@ class MultiLanguagePowerPointComponent(Component):
 
     def _add_logo_at_fixed_position(self, slide, logo_data):
         try:
-            cm = 0.393701
-            left   = Inches(29.81 * cm)
-            top    = Inches(0.81  * cm)
-            width  = Inches(2.87  * cm)
-            height = Inches(2.53  * cm)
-
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                tmp.write(logo_data)
-                tmp_path = tmp.name
-
-            try:
-                slide.shapes.add_picture(tmp_path, left, top, width, height)
-                return True
-            finally:
-                try:
-                    os.unlink(tmp_path)
-                except Exception:
-                    pass
+            slide.shapes.add_picture(io.BytesIO(logo_data), LOGO_LEFT, LOGO_TOP, LOGO_WIDTH, LOGO_HEIGHT)
+            return True
 
         except Exception as e:
             print(f"Error adding logo: {e}")
@@ -151,13 +203,7 @@ class MultiLanguagePowerPointComponent(Component):
 
     def _add_logo_placeholder(self, slide):
         try:
-            cm = 0.393701
-            left   = Inches(29.81 * cm)
-            top    = Inches(0.81  * cm)
-            width  = Inches(2.87  * cm)
-            height = Inches(2.53  * cm)
-
-            textbox = slide.shapes.add_textbox(left, top, width, height)
+            textbox = slide.shapes.add_textbox(LOGO_LEFT, LOGO_TOP, LOGO_WIDTH, LOGO_HEIGHT)
             tf = textbox.text_frame
             tf.text = "Logo Here"
             p = tf.paragraphs[0]
@@ -176,16 +222,15 @@ class MultiLanguagePowerPointComponent(Component):
     #  Build one PPTX for a single language                                #
     # ------------------------------------------------------------------ #
 
-    def _create_single_pptx(self, language: str, sections: dict, logo_data=None) -> tuple[bytes, str] | None:
+    def _create_single_pptx(self, language: str, sections: dict, template, logo_data=None) -> tuple[bytes, str] | None:
         """
-        Create one PPTX for the given language.
+        Create one PPTX for the given language from a copy of the parsed template.
         Returns (file_bytes, filename) or None on failure.
         """
-        if not os.path.exists(TEMPLATE_PATH):
-            print(f"Template not found: {TEMPLATE_PATH}")
+        if template is None:
             return None
 
-        prs = Presentation(TEMPLATE_PATH)
+        prs = copy.deepcopy(template)
 
         # Build replacements from sections
         replacements = {}
@@ -195,8 +240,9 @@ class MultiLanguagePowerPointComponent(Component):
                 replacements[placeholder] = value
 
         # Process slides
+        placeholder_pattern = self._compile_placeholder_pattern(replacements) if replacements else None
         for slide_idx, slide in enumerate(prs.slides):
-            self._find_and_replace_text_in_slide(slide, replacements)
+            self._find_and_replace_text_in_slide(slide, replacements, placeholder_pattern)
 
             # Logo on first slide
             if slide_idx == 0:
@@ -205,15 +251,10 @@ class MultiLanguagePowerPointComponent(Component):
                 else:
                     self._add_logo_placeholder(slide)
 
-        # Save to bytes
-        tmp = tempfile.NamedTemporaryFile(suffix=".pptx", delete=False)
-        tmp_path = tmp.name
-        tmp.close()
-
-        prs.save(tmp_path)
-        with open(tmp_path, "rb") as f:
-            file_bytes = f.read()
-        os.unlink(tmp_path)
+        # Save in memory; the package is only needed as bytes
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        file_bytes = buffer.getvalue()
 
         # Build filename
         customer = sections.get("Client_Name", "client").replace(" ", "_").lower()
@@ -259,8 +300,9 @@ class MultiLanguagePowerPointComponent(Component):
         if self.logo_base64 and self.logo_base64.strip():
             logo_data, _ = self._decode_base64_image(self.logo_base64.strip())
 
-        # Generate one PPTX per language
+        # Collect the languages to build; skipped ones keep their place in the response
         response_parts = []
+        pending = []
         files_created = 0
 
         for entry in translations:
@@ -276,24 +318,44 @@ class MultiLanguagePowerPointComponent(Component):
                 response_parts.append(f"⚠️ Skipped {language}: no sections.")
                 continue
 
-            result = self._create_single_pptx(language, sections, logo_data)
-            if result is None:
-                response_parts.append(f"❌ Failed to create PPTX for {language}.")
-                continue
+            pending.append((len(response_parts), language, sections))
+            response_parts.append(None)
 
-            file_bytes, filename = result
-            b64_content = base64.b64encode(file_bytes).decode("utf-8")
-
-            response_parts.append(
-                f"{language}: {filename}\n\n"
-                f"<{PPTX_MAGIC_BYTES}>\n"
-                f"filename:{filename}\n"
-                f"content_type:application/vnd.openxmlformats-officedocument.presentationml.presentation\n"
-                f"size:{len(file_bytes)}\n"
-                f"data:{b64_content}\n"
-                f"</{PPTX_MAGIC_BYTES}>"
+        # Load the template once up front; every worker fills its own copy of it
+        template = None
+        if pending:
+            try:
+                template = _load_template(TEMPLATE_PATH)
+            except FileNotFoundError:
+                print(f"Template not found: {TEMPLATE_PATH}")
+
+        # Generate one PPTX per language. The presentations are independent, and lxml
+        # serialization and zip compression release the GIL, so a few threads overlap them
+        max_workers = max(1, min(len(pending), PPTX_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda job: self._create_single_pptx(job[1], job[2], template, logo_data),
+                pending
             )
-            files_created += 1
+
+            for (part_index, language, _), result in zip(pending, results):
+                if result is None:
+                    response_parts[part_index] = f"❌ Failed to create PPTX for {language}."
+                    continue
+
+                file_bytes, filename = result
+                b64_content = base64.b64encode(file_bytes).decode("utf-8")
+
+                response_parts[part_index] = (
+                    f"{language}: {filename}\n\n"
+                    f"<{PPTX_MAGIC_BYTES}>\n"
+                    f"filename:{filename}\n"
+                    f"content_type:application/vnd.openxmlformats-officedocument.presentationml.presentation\n"
+                    f"size:{len(file_bytes)}\n"
+                    f"data:{b64_content}\n"
+                    f"</{PPTX_MAGIC_BYTES}>"
+                )
+                files_created += 1
 
         self.status = f"Created {files_created} PPTX file(s) for {len(translations)} language(s)."
 
@@ -5,8 +5,8 @@ from langflow.schema.message import Message
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import tempfile
 import base64
+import io
 import os
 from dotenv import load_dotenv
 
@@ -109,15 +109,10 @@ class MultiLanguageWordComponent(Component):
                 if content:
                     self._add_section(doc, section_title, content)
 
-            # Save to bytes
-            tmp = tempfile.NamedTemporaryFile(suffix=".docx", delete=False)
-            tmp_path = tmp.name
-            tmp.close()
-
-            doc.save(tmp_path)
-            with open(tmp_path, "rb") as f:
-                file_bytes = f.read()
-            os.unlink(tmp_path)
+            # Save in memory; the package is only needed as bytes
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            file_bytes = buffer.getvalue()
 
             # Filename
             customer_slug = customer.replace(" ", "_").lower()
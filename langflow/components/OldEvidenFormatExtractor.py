@@ -2,10 +2,10 @@ from langflow.custom import Component
 from langflow.io import Output, MultilineInput
 from langflow.schema import Message
 import base64
-import tempfile
+import io
 import os
 from pptx import Presentation
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,40 +36,42 @@ class CombinedPPTXExtractorCreator(Component):
         )
     ]
 
-    def is_pptx_file(self, file_data: bytes) -> bool:
-        """Check if the file data represents a valid PPTX file"""
+    def open_pptx(self, file_data: bytes) -> Optional[Presentation]:
+        """
+        Parse the file data as a PPTX presentation
+
+        The parsed presentation is used for extraction as well, so each source
+        file is only unzipped and parsed once.
+
+        Returns:
+            The presentation, None if the data is not a valid PPTX file
+        """
         try:
             if not file_data.startswith(b'PK\x03\x04'):
-                return False
-
-            with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_file:
-                temp_file.write(file_data)
-                temp_file_path = temp_file.name
-
-            try:
-                prs = Presentation(temp_file_path)
-                _ = len(prs.slides)
-                return True
-            except Exception:
-                return False
-            finally:
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+                return None
+
+            prs = Presentation(io.BytesIO(file_data))
+            _ = len(prs.slides)
+            return prs
 
         except Exception:
-            return False
+            return None
 
     def get_text_shapes_from_slide(self, slide) -> List[Dict]:
         """Extract all text shapes from a slide with their spatial information"""
         text_shapes = []
 
         for shape in slide.shapes:
-            if hasattr(shape, 'text_frame') and shape.text_frame.text.strip():
-                text = shape.text_frame.text.strip()
+            if not hasattr(shape, 'text_frame'):
+                continue
+
+            # text_frame.text rebuilds the string from the XML, so read it only once
+            text = shape.text_frame.text.strip()
+            if text:
                 text_shapes.append({
                     'text': text,
+                    # Lowercased once here instead of on every title lookup
+                    'text_lower': text.lower(),
                     'left': shape.left,
                     'top': shape.top,
                     'width': shape.width,
@@ -78,59 +80,61 @@ class CombinedPPTXExtractorCreator(Component):
 
         return text_shapes
 
-    def find_text_below_title(self, text_shapes: List[Dict], title_keyword: str, x_margin: int = 720000) -> str:
-        """Find a title with the keyword and return the first text field below it with similar x-coordinate"""
-        title_shape = None
+    def find_title_shapes(self, text_shapes: List[Dict], title_keywords: List[str]) -> Dict[str, Dict]:
+        """Find the first title shape containing each keyword, in a single pass over the text shapes"""
+        keywords = [(keyword, keyword.lower()) for keyword in title_keywords]
+        title_shapes = {}
 
-        # Find the title shape containing our keyword
         for shape in text_shapes:
-            text_lower = shape['text'].lower().strip()
-            if title_keyword.lower() in text_lower and len(shape['text']) <= 50:  # Likely a title
-                title_shape = shape
-                break
+            if len(shape['text']) > 50:  # Too long to be a title
+                continue
 
-        if not title_shape:
-            return ""
+            for keyword, keyword_lower in keywords:
+                if keyword not in title_shapes and keyword_lower in shape['text_lower']:
+                    title_shapes[keyword] = shape
 
-        title_x = title_shape['left']
-        title_y = title_shape['top']
+            if len(title_shapes) == len(keywords):
+                break
 
-        # Find text fields below the title with similar x-coordinate
-        candidates = []
+        return title_shapes
 
-        for shape in text_shapes:
-            # Skip the title itself
-            if shape['left'] == title_x and shape['top'] == title_y:
-                continue
+    def find_texts_below_titles(self, text_shapes: List[Dict], title_shapes: Dict[str, Dict],
+                                x_margin: int = 720000) -> Dict[str, str]:
+        """
+        For every found title, find the closest text field below it with similar x-coordinate,
+        in a single pass over the text shapes. Titles without such a field are left out.
+        """
+        # Per title: (y_distance, x_distance, index) of the closest field so far
+        closest: Dict[str, Tuple[int, int, int]] = {}
 
-            # Must be below the title
-            if shape['top'] <= title_y:
-                continue
+        for index, shape in enumerate(text_shapes):
+            for keyword, title_shape in title_shapes.items():
+                y_distance = shape['top'] - title_shape['top']
+                # Must be below the title (which also skips the title itself)
+                if y_distance <= 0:
+                    continue
 
-            # Check if x-coordinate is within margin
-            x_distance = abs(shape['left'] - title_x)
-            if x_distance <= x_margin:
-                y_distance = shape['top'] - title_y
-                candidates.append({
-                    'text': shape['text'],
-                    'y_distance': y_distance,
-                    'x_distance': x_distance
-                })
+                x_distance = abs(shape['left'] - title_shape['left'])
+                if x_distance > x_margin:
+                    continue
 
-        if candidates:
-            # Sort by y_distance (closest below the title) then by x_distance
-            candidates.sort(key=lambda x: (x['y_distance'], x['x_distance']))
-            return candidates[0]['text']
+                # Smallest y_distance, then x_distance; the earliest shape wins ties
+                candidate = (y_distance, x_distance, index)
+                if keyword not in closest or candidate < closest[keyword]:
+                    closest[keyword] = candidate
 
-        return ""
+        return {keyword: text_shapes[candidate[2]]['text'] for keyword, candidate in closest.items()}
 
     def extract_fields_from_slide(self, slide, slide_number: int) -> Dict[str, str]:
         """Extract Challenge, Solution, and Value from a single slide"""
         text_shapes = self.get_text_shapes_from_slide(slide)
 
-        challenge = self.find_text_below_title(text_shapes, "Challenge")
-        solution = self.find_text_below_title(text_shapes, "Solution")
-        value = self.find_text_below_title(text_shapes, "Value")
+        title_shapes = self.find_title_shapes(text_shapes, ["Challenge", "Solution", "Value"])
+        texts_below = self.find_texts_below_titles(text_shapes, title_shapes)
+
+        challenge = texts_below.get("Challenge", "")
+        solution = texts_below.get("Solution", "")
+        value = texts_below.get("Value", "")
 
         return {
             'slide_number': slide_number,
@@ -207,18 +211,10 @@ class CombinedPPTXExtractorCreator(Component):
             for slide_idx, slide in enumerate(prs.slides):
                 self.find_and_replace_text_in_slide(slide, replacements)
 
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.pptx', delete=False)
-            temp_file_path = temp_file.name
-            temp_file.close()
-
-            prs.save(temp_file_path)
-
-            # Read and encode
-            with open(temp_file_path, 'rb') as f:
-                file_content = f.read()
-
-            os.unlink(temp_file_path)
+            # Save in memory; the package is only needed as bytes
+            buffer = io.BytesIO()
+            prs.save(buffer)
+            file_content = buffer.getvalue()
 
             # Encode to base64
             base64_content = base64.b64encode(file_content).decode('utf-8')
@@ -264,18 +260,10 @@ data:{base64_content}
             for slide_idx, slide in enumerate(prs.slides):
                 self.find_and_replace_text_in_slide(slide, replacements)
 
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.pptx', delete=False)
-            temp_file_path = temp_file.name
-            temp_file.close()
-
-            prs.save(temp_file_path)
-
-            # Read and encode
-            with open(temp_file_path, 'rb') as f:
-                file_content = f.read()
-
-            os.unlink(temp_file_path)
+            # Save in memory; the package is only needed as bytes
+            buffer = io.BytesIO()
+            prs.save(buffer)
+            file_content = buffer.getvalue()
 
             # Encode to base64
             base64_content = base64.b64encode(file_content).decode('utf-8')
@@ -295,38 +283,26 @@ data:{base64_content}
         except Exception as e:
             return f"❌ Failed to create PowerPoint for reference {reference_index}: {str(e)}\n"
 
-    def extract_and_create_from_pptx(self, file_data: bytes, file_index: int) -> Tuple[bool, str, int]:
-        """Extract data from PPTX and create PowerPoint files for each valid reference"""
+    def extract_and_create_from_pptx(self, prs: Presentation, file_index: int) -> Tuple[bool, str, int]:
+        """Extract data from a parsed PPTX and create PowerPoint files for each valid reference"""
         try:
-            with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_file:
-                temp_file.write(file_data)
-                temp_file_path = temp_file.name
-
-            try:
-                prs = Presentation(temp_file_path)
-                output_text = f"📊 Processing File {file_index}:\n"
-                powerpoints_created = 0
-                reference_index = 1
-
-                # Process each slide
-                for slide_idx, slide in enumerate(prs.slides, 1):
-                    slide_data = self.extract_fields_from_slide(slide, slide_idx)
-
-                    # Only create PowerPoint if slide has valid content
-                    if self.has_valid_content(slide_data):
-                        powerpoint_result = self.create_powerpoint_from_data(slide_data, reference_index)
-                        output_text += powerpoint_result
-                        powerpoints_created += 1
-                        reference_index += 1
-
-                output_text += f"✅ File {file_index} processed: {powerpoints_created} PowerPoints created from {len(prs.slides)} slides\n\n"
-                return True, output_text, powerpoints_created
-
-            finally:
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+            output_text = f"📊 Processing File {file_index}:\n"
+            powerpoints_created = 0
+            reference_index = 1
+
+            # Process each slide
+            for slide_idx, slide in enumerate(prs.slides, 1):
+                slide_data = self.extract_fields_from_slide(slide, slide_idx)
+
+                # Only create PowerPoint if slide has valid content
+                if self.has_valid_content(slide_data):
+                    powerpoint_result = self.create_powerpoint_from_data(slide_data, reference_index)
+                    output_text += powerpoint_result
+                    powerpoints_created += 1
+                    reference_index += 1
+
+            output_text += f"✅ File {file_index} processed: {powerpoints_created} PowerPoints created from {len(prs.slides)} slides\n\n"
+            return True, output_text, powerpoints_created
 
         except Exception as e:
             return False, f"❌ Error processing file {file_index}: {str(e)}\n", 0
@@ -352,10 +328,11 @@ data:{base64_content}
 
             file_data = base64.b64decode(clean_b64)
 
-            if not self.is_pptx_file(file_data):
+            prs = self.open_pptx(file_data)
+            if prs is None:
                 return f"❌ File {index} is not a valid PPTX format", False, "", 0
 
-            success, content, count = self.extract_and_create_from_pptx(file_data, index)
+            success, content, count = self.extract_and_create_from_pptx(prs, index)
 
             if success:
                 return f"✅ Successfully processed PPTX file {index}", True, content, count
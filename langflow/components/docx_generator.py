@@ -4,8 +4,8 @@ from langflow.schema import Message
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import tempfile
 import base64
+import io
 import os
 from dotenv import load_dotenv
 
@@ -139,16 +139,9 @@ class AtosTemplateWordComponent(Component):
 
             print(f"✅ Document created with {len(sections)} sections")
 
-            temp_file = tempfile.NamedTemporaryFile(suffix='.docx', delete=False)
-            temp_file_path = temp_file.name
-            temp_file.close()
-
-            doc.save(temp_file_path)
-
-            with open(temp_file_path, 'rb') as f:
-                file_content = f.read()
-
-            os.unlink(temp_file_path)
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            file_content = buffer.getvalue()
 
             base64_content = base64.b64encode(file_content).decode('utf-8')
             filename = f"reference_{self.customer_name.replace(' ', '_').lower()}.docx"
@@ -1,21 +1,65 @@
+import re
 from langflow.custom import Component
 from langflow.io import Output, MultilineInput
 from langflow.schema import Message
+from lxml import etree
 from pptx import Presentation
 from pptx.util import Inches
 from pptx.dml.color import RGBColor
 from PIL import Image
-import tempfile
 import base64
+import copy
 import os
 import io
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 PPTX_MAGIC_BYTES = os.getenv("PPTX_MAGIC_BYTES")
 EXTENDED_TEMPLATE_PATH = os.getenv("EXTENDED_TEMPLATE_PATH")
 
+# Logo box on the first slide: (29.81cm, 0.81cm), 2.87cm x 2.53cm
+CM_TO_INCHES = 0.393701
+LOGO_LEFT = Inches(29.81 * CM_TO_INCHES)
+LOGO_TOP = Inches(0.81 * CM_TO_INCHES)
+LOGO_WIDTH = Inches(2.87 * CM_TO_INCHES)
+LOGO_HEIGHT = Inches(2.53 * CM_TO_INCHES)
+
+# Parsed templates per path, keyed by mtime and size so an edited template is read again
+_template_cache = {}
+
+
+def _load_template(template_path):
+    """
+    Parse a template file once per process instead of on every generated presentation.
+    The returned Presentation is shared and must not be modified; work on a copy.deepcopy of it,
+    which clones the parsed XML trees much faster than parsing them again.
+    """
+    stat = os.stat(template_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _template_cache.get(template_path)
+    if cached is None or cached[0] != version:
+        with open(template_path, "rb") as f:
+            cached = (version, Presentation(io.BytesIO(f.read())))
+        _template_cache[template_path] = cached
+
+    return cached[1]
+
+
+_TEXT_ELEMENTS = etree.XPath(
+    ".//a:t", namespaces={"a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+)
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0B-\x1F]")
+
+
+def _escape_ctrl_chars(text):
+    """Escape control characters the way python-pptx does when run text is assigned"""
+    return _CONTROL_CHARS.sub(lambda match: "_x%04X_" % ord(match.group(0)), text)
+
 
 class AtosExtendedTemplatePowerPointComponent(Component):
     display_name = "Atos Extended Template PowerPoint"
@@ -117,37 +161,43 @@ class AtosExtendedTemplatePowerPointComponent(Component):
         )
     ]
 
-    def find_and_replace_text_in_slide(self, slide, replacements):
+    @staticmethod
+    def compile_placeholder_pattern(replacements):
         """
-        Find and replace text in all text boxes on a slide
+        Build one regex alternation of all placeholders, so each text element is scanned in a single pass
         """
+        return re.compile("|".join(re.escape(placeholder) for placeholder in replacements))
+
+    def find_and_replace_text_in_slide(self, slide, replacements, placeholder_pattern=None):
+        """
+        Find and replace text in all text elements on a slide
+        """
+        if not replacements:
+            return 0
+        if placeholder_pattern is None:
+            placeholder_pattern = self.compile_placeholder_pattern(replacements)
+
+        def substitute(match):
+            placeholder = match.group(0)
+            replacement = replacements[placeholder]
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Replaced '%s' with '%s...'", placeholder, replacement[:30])
+            return replacement
+
         replacements_made = 0
 
-        for shape in slide.shapes:
-            if hasattr(shape, "text_frame"):
-                text_frame = shape.text_frame
-
-                for paragraph in text_frame.paragraphs:
-                    for run in paragraph.runs:
-                        original_text = run.text
-
-                        for placeholder, replacement in replacements.items():
-                            if placeholder in run.text:
-                                run.text = run.text.replace(placeholder, replacement)
-                                replacements_made += 1
-                                print(f"✓ Replaced '{placeholder}' with '{replacement[:30]}...'")
-
-            elif hasattr(shape, "table"):
-                table = shape.table
-                for row in table.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.text_frame.paragraphs:
-                            for run in paragraph.runs:
-                                for placeholder, replacement in replacements.items():
-                                    if placeholder in run.text:
-                                        run.text = run.text.replace(placeholder, replacement)
-                                        replacements_made += 1
-                                        print(f"✓ Replaced '{placeholder}' with '{replacement[:30]}...' (in table)")
+        # One compiled XPath query walks the slide XML for every a:t element (text boxes,
+        # grouped shapes and table cells alike) without building shape/paragraph/run proxies
+        for text_element in _TEXT_ELEMENTS(slide.element):
+            text = text_element.text
+            # Every placeholder starts with "{{", so most elements are skipped without a regex scan
+            if not text or "{{" not in text:
+                continue
+
+            new_text, count = placeholder_pattern.subn(substitute, text)
+            if count:
+                text_element.text = _escape_ctrl_chars(new_text)
+                replacements_made += count
 
         return replacements_made
 
@@ -163,17 +213,33 @@ class AtosExtendedTemplatePowerPointComponent(Component):
 
             img = Image.open(io.BytesIO(image_data))
 
-            # Convert to RGB if necessary (for JPEG compatibility)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background
+            # Opening only reads the header; PNG and JPEG logos that need no flattening
+            # are embedded as they are instead of being decoded and re-encoded
+            if img.format in ('PNG', 'JPEG') and img.mode in ('RGB', 'L'):
+                return image_data, img.size
+
+            # Logos whose transparency is unused look the same without the white background
+            is_opaque = False
+            if img.mode == 'P':
+                is_opaque = 'transparency' not in img.info
+            elif img.mode in ('RGBA', 'LA'):
+                is_opaque = img.getchannel('A').getextrema()[0] == 255
+
+            if is_opaque:
+                if img.format == 'PNG':
+                    return image_data, img.size
+                img = img.convert('RGB')
+            elif img.mode in ('RGBA', 'LA', 'P'):
+                # Convert to RGB on a white background (for JPEG compatibility)
                 background = Image.new('RGB', img.size, (255, 255, 255))
                 if img.mode == 'P':
                     img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+                background.paste(img, mask=img.getchannel('A'))
                 img = background
 
             img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
+            # Fast deflate: the buffer is only an intermediate copy for the slide
+            img.save(img_buffer, format='PNG', optimize=False, compress_level=1)
             img_buffer.seek(0)
 
             return img_buffer.getvalue(), img.size
@@ -184,28 +250,11 @@ class AtosExtendedTemplatePowerPointComponent(Component):
 
     def add_logo_at_fixed_position(self, slide, logo_data):
         try:
-            cm_to_inches = 0.393701
-
-            left = Inches(29.81 * cm_to_inches)
-            top = Inches(0.81 * cm_to_inches)
-            width = Inches(2.87 * cm_to_inches)
-            height = Inches(2.53 * cm_to_inches)
-
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                tmp_file.write(logo_data)
-                tmp_logo_path = tmp_file.name
-
-            try:
-                pic = slide.shapes.add_picture(tmp_logo_path, left, top, width, height)
-
-                print(f"✓ Added logo at position ({29.81:.2f}cm, {0.81:.2f}cm) with size {2.87:.2f}cm x {2.53:.2f}cm")
-                return True
+            # add_picture reads file-like objects, so the logo never touches the disk
+            slide.shapes.add_picture(io.BytesIO(logo_data), LOGO_LEFT, LOGO_TOP, LOGO_WIDTH, LOGO_HEIGHT)
 
-            finally:
-                try:
-                    os.unlink(tmp_logo_path)
-                except:
-                    pass
+            logger.debug("Added logo at position (29.81cm, 0.81cm) with size 2.87cm x 2.53cm")
+            return True
 
         except Exception as e:
             print(f"❌ Error adding logo: {e}")
@@ -213,14 +262,7 @@ class AtosExtendedTemplatePowerPointComponent(Component):
 
     def add_logo_placeholder(self, slide):
         try:
-            cm_to_inches = 0.393701
-
-            left = Inches(29.81 * cm_to_inches)
-            top = Inches(0.81 * cm_to_inches)
-            width = Inches(2.87 * cm_to_inches)
-            height = Inches(2.53 * cm_to_inches)
-
-            textbox = slide.shapes.add_textbox(left, top, width, height)
+            textbox = slide.shapes.add_textbox(LOGO_LEFT, LOGO_TOP, LOGO_WIDTH, LOGO_HEIGHT)
             text_frame = textbox.text_frame
             text_frame.text = "Logo Here"
 
@@ -234,7 +276,7 @@ class AtosExtendedTemplatePowerPointComponent(Component):
             line.color.rgb = RGBColor(200, 200, 200)
             line.width = Inches(0.01)
 
-            print(f"✓ Added logo placeholder at position ({29.81:.2f}cm, {0.81:.2f}cm)")
+            logger.debug("Added logo placeholder at position (29.81cm, 0.81cm)")
             return True
 
         except Exception as e:
@@ -245,11 +287,11 @@ class AtosExtendedTemplatePowerPointComponent(Component):
         """Create PowerPoint from Atos extended template by replacing placeholders"""
 
         try:
-            if not os.path.exists(EXTENDED_TEMPLATE_PATH):
+            try:
+                prs = copy.deepcopy(_load_template(EXTENDED_TEMPLATE_PATH))
+            except FileNotFoundError:
                 return (f"❌ Template file not found at {EXTENDED_TEMPLATE_PATH}. Please save your PowerPoint template as "
                         f"'template.pptx' in the same directory.")
-
-            prs = Presentation(EXTENDED_TEMPLATE_PATH)
             print(f"✓ Loaded extended template with {len(prs.slides)} slides")
 
             # Extended replacements with all fields including technology sections
@@ -283,15 +325,18 @@ class AtosExtendedTemplatePowerPointComponent(Component):
                     has_logo = False
                     print("❌ Failed to decode logo")
 
+            # Compile the placeholder pattern once for all slides
+            placeholder_pattern = self.compile_placeholder_pattern(replacements)
+
             # Process all slides
             total_replacements = 0
             for slide_idx, slide in enumerate(prs.slides):
-                print(f"\n🔄 Processing slide {slide_idx + 1}...")
+                logger.debug("Processing slide %d", slide_idx + 1)
 
                 # Replace text placeholders on this slide
-                replacements_made = self.find_and_replace_text_in_slide(slide, replacements)
+                replacements_made = self.find_and_replace_text_in_slide(slide, replacements, placeholder_pattern)
                 total_replacements += replacements_made
-                print(f"✓ Made {replacements_made} text replacements on slide {slide_idx + 1}")
+                logger.debug("Made %d text replacements on slide %d", replacements_made, slide_idx + 1)
 
                 # Add logo only to the first slide (slide 0)
                 if slide_idx == 0:
@@ -300,19 +345,10 @@ class AtosExtendedTemplatePowerPointComponent(Component):
                     else:
                         self.add_logo_placeholder(slide)
 
-            # Save the presentation to a temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.pptx', delete=False)
-            temp_file_path = temp_file.name
-            temp_file.close()
-
-            prs.save(temp_file_path)
-
-            # Read the file content and encode it
-            with open(temp_file_path, 'rb') as f:
-                file_content = f.read()
-
-            # Clean up the temporary file
-            os.unlink(temp_file_path)
+            # Save in memory; the package is only needed as bytes
+            buffer = io.BytesIO()
+            prs.save(buffer)
+            file_content = buffer.getvalue()
 
             # Encode to base64 for transmission
             base64_content = base64.b64encode(file_content).decode('utf-8')
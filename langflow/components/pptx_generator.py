@@ -2,21 +2,64 @@ import re
 from langflow.custom import Component
 from langflow.io import Output, MultilineInput
 from langflow.schema.message import Message
+from lxml import etree
 from pptx import Presentation
 from pptx.util import Inches
 from pptx.dml.color import RGBColor
 from PIL import Image
-import tempfile
 import base64
+import copy
 import os
 import io
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 PPTX_MAGIC_BYTES = os.getenv("PPTX_MAGIC_BYTES")
 TEMPLATE_PATH = os.getenv("TEMPLATE_PATH")
 
+# Logo box on the first slide: (29.81cm, 0.81cm), 2.87cm x 2.53cm
+CM_TO_INCHES = 0.393701
+LOGO_LEFT = Inches(29.81 * CM_TO_INCHES)
+LOGO_TOP = Inches(0.81 * CM_TO_INCHES)
+LOGO_WIDTH = Inches(2.87 * CM_TO_INCHES)
+LOGO_HEIGHT = Inches(2.53 * CM_TO_INCHES)
+
+# Parsed templates per path, keyed by mtime and size so an edited template is read again
+_template_cache = {}
+
+
+def _load_template(template_path):
+    """
+    Parse a template file once per process instead of on every generated presentation.
+    The returned Presentation is shared and must not be modified; work on a copy.deepcopy of it,
+    which clones the parsed XML trees much faster than parsing them again.
+    """
+    stat = os.stat(template_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _template_cache.get(template_path)
+    if cached is None or cached[0] != version:
+        with open(template_path, "rb") as f:
+            cached = (version, Presentation(io.BytesIO(f.read())))
+        _template_cache[template_path] = cached
+
+    return cached[1]
+
+
+_TEXT_ELEMENTS = etree.XPath(
+    ".//a:t", namespaces={"a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+)
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0B-\x1F]")
+
+
+def _escape_ctrl_chars(text):
+    """Escape control characters the way python-pptx does when run text is assigned"""
+    return _CONTROL_CHARS.sub(lambda match: "_x%04X_" % ord(match.group(0)), text)
+
 
 class AtosTemplatePowerPointComponent(Component):
     display_name = "Atos Template PowerPoint"
@@ -82,31 +125,38 @@ class AtosTemplatePowerPointComponent(Component):
         )
     ]
 
-    def find_and_replace_text_in_slide(self, slide, replacements):
+    @staticmethod
+    def compile_placeholder_pattern(replacements):
+        """One alternation of all placeholders, so each text element is scanned in a single pass"""
+        return re.compile("|".join(re.escape(placeholder) for placeholder in replacements))
+
+    def find_and_replace_text_in_slide(self, slide, replacements, placeholder_pattern=None):
+        if not replacements:
+            return 0
+        if placeholder_pattern is None:
+            placeholder_pattern = self.compile_placeholder_pattern(replacements)
+
+        def substitute(match):
+            placeholder = match.group(0)
+            replacement = replacements[placeholder]
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Replaced '%s' with '%s...'", placeholder, replacement[:30])
+            return replacement
+
         replacements_made = 0
 
-        for shape in slide.shapes:
-            if hasattr(shape, "text_frame"):
-                text_frame = shape.text_frame
-                for paragraph in text_frame.paragraphs:
-                    for run in paragraph.runs:
-                        for placeholder, replacement in replacements.items():
-                            if placeholder in run.text:
-                                run.text = run.text.replace(placeholder, replacement)
-                                replacements_made += 1
-                                print(f"✓ Replaced '{placeholder}' with '{replacement[:30]}...'")
-
-            elif hasattr(shape, "table"):
-                table = shape.table
-                for row in table.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.text_frame.paragraphs:
-                            for run in paragraph.runs:
-                                for placeholder, replacement in replacements.items():
-                                    if placeholder in run.text:
-                                        run.text = run.text.replace(placeholder, replacement)
-                                        replacements_made += 1
-                                        print(f"✓ Replaced '{placeholder}' with '{replacement[:30]}...' (in table)")
+        # One compiled XPath query walks the slide XML for every a:t element (text boxes,
+        # grouped shapes and table cells alike) without building shape/paragraph/run proxies
+        for text_element in _TEXT_ELEMENTS(slide.element):
+            text = text_element.text
+            # Every placeholder starts with "{{", so most elements are skipped without a regex scan
+            if not text or "{{" not in text:
+                continue
+
+            new_text, count = placeholder_pattern.subn(substitute, text)
+            if count:
+                text_element.text = _escape_ctrl_chars(new_text)
+                replacements_made += count
 
         return replacements_made
 
@@ -118,15 +168,33 @@ class AtosTemplatePowerPointComponent(Component):
             image_data = base64.b64decode(base64_string)
             img = Image.open(io.BytesIO(image_data))
 
-            if img.mode in ('RGBA', 'LA', 'P'):
+            # Opening only reads the header; PNG and JPEG logos that need no flattening
+            # are embedded as they are instead of being decoded and re-encoded
+            if img.format in ('PNG', 'JPEG') and img.mode in ('RGB', 'L'):
+                return image_data, img.size
+
+            # Logos whose transparency is unused look the same without the white background
+            is_opaque = False
+            if img.mode == 'P':
+                is_opaque = 'transparency' not in img.info
+            elif img.mode in ('RGBA', 'LA'):
+                is_opaque = img.getchannel('A').getextrema()[0] == 255
+
+            if is_opaque:
+                if img.format == 'PNG':
+                    return image_data, img.size
+                img = img.convert('RGB')
+
+            elif img.mode in ('RGBA', 'LA', 'P'):
                 background = Image.new('RGB', img.size, (255, 255, 255))
                 if img.mode == 'P':
                     img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+                background.paste(img, mask=img.getchannel('A'))
                 img = background
 
             img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
+            # Fast deflate: the buffer is only an intermediate copy for the slide
+            img.save(img_buffer, format='PNG', optimize=False, compress_level=1)
             img_buffer.seek(0)
 
             return img_buffer.getvalue(), img.size
@@ -137,25 +205,10 @@ class AtosTemplatePowerPointComponent(Component):
 
     def add_logo_at_fixed_position(self, slide, logo_data):
         try:
-            cm_to_inches = 0.393701
-            left   = Inches(29.81 * cm_to_inches)
-            top    = Inches(0.81  * cm_to_inches)
-            width  = Inches(2.87  * cm_to_inches)
-            height = Inches(2.53  * cm_to_inches)
-
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                tmp_file.write(logo_data)
-                tmp_logo_path = tmp_file.name
-
-            try:
-                slide.shapes.add_picture(tmp_logo_path, left, top, width, height)
-                print(f"✓ Added logo at position (29.81cm, 0.81cm) with size 2.87cm x 2.53cm")
-                return True
-            finally:
-                try:
-                    os.unlink(tmp_logo_path)
-                except:
-                    pass
+            # add_picture reads file-like objects, so the logo never touches the disk
+            slide.shapes.add_picture(io.BytesIO(logo_data), LOGO_LEFT, LOGO_TOP, LOGO_WIDTH, LOGO_HEIGHT)
+            logger.debug("Added logo at position (29.81cm, 0.81cm) with size 2.87cm x 2.53cm")
+            return True
 
         except Exception as e:
             print(f"❌ Error adding logo: {e}")
@@ -163,13 +216,7 @@ class AtosTemplatePowerPointComponent(Component):
 
     def add_logo_placeholder(self, slide):
         try:
-            cm_to_inches = 0.393701
-            left   = Inches(29.81 * cm_to_inches)
-            top    = Inches(0.81  * cm_to_inches)
-            width  = Inches(2.87  * cm_to_inches)
-            height = Inches(2.53  * cm_to_inches)
-
-            textbox = slide.shapes.add_textbox(left, top, width, height)
+            textbox = slide.shapes.add_textbox(LOGO_LEFT, LOGO_TOP, LOGO_WIDTH, LOGO_HEIGHT)
             text_frame = textbox.text_frame
             text_frame.text = "Logo Here"
 
@@ -183,7 +230,7 @@ class AtosTemplatePowerPointComponent(Component):
             line.color.rgb = RGBColor(200, 200, 200)
             line.width = Inches(0.01)
 
-            print(f"✓ Added logo placeholder at position (29.81cm, 0.81cm)")
+            logger.debug("Added logo placeholder at position (29.81cm, 0.81cm)")
             return True
 
         except Exception as e:
@@ -199,10 +246,10 @@ class AtosTemplatePowerPointComponent(Component):
         # ────────────────────────────────────────────────────────────────
 
         try:
-            if not os.path.exists(TEMPLATE_PATH):
+            try:
+                prs = copy.deepcopy(_load_template(TEMPLATE_PATH))
+            except FileNotFoundError:
                 return Message(text=f"❌ Template file not found at {TEMPLATE_PATH}.")
-
-            prs = Presentation(TEMPLATE_PATH)
             print(f"✓ Loaded template with {len(prs.slides)} slides")
 
             replacements = {
@@ -226,9 +273,11 @@ class AtosTemplatePowerPointComponent(Component):
                     has_logo = False
                     print("❌ Failed to decode logo")
 
+            placeholder_pattern = self.compile_placeholder_pattern(replacements)
+
             for slide_idx, slide in enumerate(prs.slides):
-                print(f"\n🔄 Processing slide {slide_idx + 1}...")
-                self.find_and_replace_text_in_slide(slide, replacements)
+                logger.debug("Processing slide %d", slide_idx + 1)
+                self.find_and_replace_text_in_slide(slide, replacements, placeholder_pattern)
 
                 if slide_idx == 0:
                     if has_logo and logo_data:
@@ -236,16 +285,9 @@ class AtosTemplatePowerPointComponent(Component):
                     else:
                         self.add_logo_placeholder(slide)
 
-            temp_file = tempfile.NamedTemporaryFile(suffix='.pptx', delete=False)
-            temp_file_path = temp_file.name
-            temp_file.close()
-
-            prs.save(temp_file_path)
-
-            with open(temp_file_path, 'rb') as f:
-                file_content = f.read()
-
-            os.unlink(temp_file_path)
+            buffer = io.BytesIO()
+            prs.save(buffer)
+            file_content = buffer.getvalue()
 
             base64_content = base64.b64encode(file_content).decode('utf-8')
             filename = f"reference_{self.customer_name.replace(' ', '_').lower()}.pptx"